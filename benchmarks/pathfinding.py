@@ -0,0 +1,115 @@
+"""
+مقارنة خلفيات البحث عن المسار (عدد العقد الموسعة، الزمن، تكلفة المسار)
+على خريطة مفتوحة وخريطة متاهة
+
+    python -m benchmarks.pathfinding --size 200 --queries 50 --repeat 3
+    python -m benchmarks.pathfinding --size 50 --backends astar,table
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+from settings import *
+from game.world import World
+from game.ai import AStar
+from game.generator import generate_level
+from game.navigation import NavGraph
+from game.routing import NextHopTable
+
+
+def open_level(cols, rows, seed=None, pillars=0.04):
+    """خريطة مفتوحة بإطار خارجي وأعمدة 2×2 متفرقة"""
+    rng = np.random.default_rng(seed)
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 1
+    count = int(cols * rows * pillars / 4)
+    xs = rng.integers(1, cols - 2, count)
+    ys = rng.integers(1, rows - 2, count)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            grid[ys + dy, xs + dx] = 1
+    grid[1, 1] = 2
+    grid[-2, -2] = 3
+    return grid
+
+
+def path_cost(path, world, graph):
+    """مجموع تكاليف دخول الخلايا على مسار بمراكز الخلايا"""
+    cells = [graph.cell_id((int(x // world.cell_size), int(y // world.cell_size)))
+             for x, y in path]
+    return sum(graph.enter_costs[c] for c in cells[1:])
+
+
+def run(world, pairs, backend, repeat=1):
+    """متوسط العقد الموسعة وأفضل زمن (من repeat تكرارات) وتكلفة المسار لكل استعلام"""
+    settings = AI_SETTINGS['pathfinding']
+    settings['backend'] = backend
+    graph = NavGraph.for_world(world)
+    AStar.search(pairs[0][0], pairs[0][1], world)  # بناء البيانات المشتقة خارج التوقيت
+
+    best_time = None
+    for _ in range(repeat):
+        AStar.expanded = 0
+        total_time = 0.0
+        total_cost = 0.0
+        for start, end in pairs:
+            # زمن المعالج للخيط: أقل تأثراً بالعمليات الأخرى على الجهاز
+            began = time.thread_time()
+            path = AStar.search(start, end, world)
+            total_time += time.thread_time() - began
+            total_cost += path_cost(path, world, graph)
+        best_time = total_time if best_time is None else min(best_time, total_time)
+    count = len(pairs)
+    return AStar.expanded / count, best_time / count * 1000, total_cost / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="مقارنة خلفيات البحث عن المسار")
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--backends', default='astar,jps')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # مسارات كاملة بدون تجانس لقياس البحث وحده
+    settings = AI_SETTINGS['pathfinding']
+    saved = dict(settings)
+    settings['max_length'] = args.size * args.size
+    settings['smoothing'] = False
+
+    maps = {
+        'open': open_level(args.size, args.size, seed=args.seed),
+        'maze': generate_level(args.size, args.size, seed=args.seed, loops=0.1),
+    }
+    rng = random.Random(args.seed)
+    print(f"{'map':<6}{'backend':<8}{'expanded':>10}{'ms/query':>10}{'cost':>10}")
+    try:
+        for name, grid in maps.items():
+            world = World(grid)
+            floor = np.argwhere(grid.T == 0)
+            pairs = []
+            for _ in range(args.queries):
+                a, b = rng.sample(range(len(floor)), 2)
+                pairs.append((tuple(floor[a].tolist()), tuple(floor[b].tolist())))
+            for backend in args.backends.split(','):
+                expanded, ms, cost = run(world, pairs, backend, args.repeat)
+                print(f"{name:<6}{backend:<8}{expanded:>10.0f}{ms:>10.2f}{cost:>10.1f}")
+                if backend == 'table':
+                    table = NextHopTable.for_world(world)
+                    if table is None:
+                        print("      (الخريطة أكبر من next_hop_max_cells: البحث كان A*)")
+                    else:
+                        print(f"      جدول: {len(table.cells)} خلية، "
+                              f"{table.memory_bytes / 2**20:.1f} MiB، خبز {table.bake_ms:.0f} ms")
+    finally:
+        settings.clear()
+        settings.update(saved)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+قياس رؤية الحراس للاعب: GuardAgent.can_see لكل حارس مقابل VisionCuller لكل الحراس
+دفعة واحدة، مع عدد الحراس المستبعدين عند كل مرحلة
+
+    python -m benchmarks.perception --size 100 --guards 2000 --frames 60
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+from game.world import World
+from game.agents import GuardAgent, PlayerAgent
+from game.perception import VisionCuller, VISION_STAGES
+from benchmarks.pathfinding import open_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس مراحل رؤية الحراس")
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--guards', type=int, default=2000)
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    world = World(open_level(args.size, args.size, seed=args.seed))
+    cs = world.cell_size
+    floor = np.argwhere(np.asarray(world.grid).T == 0) * cs + cs / 2
+    spots = floor[rng.integers(0, len(floor), args.guards)]
+    guards = [GuardAgent(x, y) for x, y in spots.tolist()]
+    for guard in guards:
+        guard.direction = float(rng.uniform(0, 360))
+    x = np.array([g.x for g in guards])
+    y = np.array([g.y for g in guards])
+    direction = np.array([g.direction for g in guards])
+    alert = np.zeros(len(guards))
+
+    players = floor[rng.integers(0, len(floor), args.frames)].tolist()
+    culler = VisionCuller()
+    single = batched = 0.0
+    for px, py in players:
+        player = PlayerAgent(px, py)
+        began = time.perf_counter()
+        expected = [guard.can_see(player, world) for guard in guards]
+        single += time.perf_counter() - began
+        began = time.perf_counter()
+        seen, _ = culler.see(x, y, direction, alert, (px, py), world)
+        batched += time.perf_counter() - began
+        assert seen.tolist() == expected
+
+    frames = len(players)
+    print(f"{'stage':<8}{'left':>10}{'culled':>10}")
+    culled = culler.culled()
+    for stage in VISION_STAGES[1:]:
+        print(f"{stage:<8}{culler.totals[stage] / frames:>10.1f}{culled[stage] / frames:>10.1f}")
+    print(f"can_see لكل حارس: {single / frames * 1000:.2f} ms/frame")
+    print(f"VisionCuller:     {batched / frames * 1000:.2f} ms/frame "
+          f"(متجه {culler.cull_ms / frames:.2f}، أشعة {culler.ray_ms / frames:.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,474 @@
+import math
+import random
+from settings import *
+from .utils import distance, angle_between
+from .ai import AStar, FlowField, ChasePlanner
+from .perception import NoiseField, noise_range
+from .squad import GUARD_STATES, STATE_CODES, MOVE_NONE, MOVE_PATH, MOVE_PATROL, MOVE_SEARCH
+
+
+class PlayerAgent:
+    """حالة اللاعب وحركته بدون أي كائن من pygame (الصورة في entities.Player)"""
+    __slots__ = ('x', 'y', 'radius', 'speed', 'is_sneaking', 'is_sprinting',
+                 'noise_level', 'stamina', 'direction')
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+        self.radius = PLAYER_SETTINGS['size']
+        self.speed = PLAYER_SETTINGS['speed']['normal']
+        self.is_sneaking = False
+        self.is_sprinting = False
+        self.noise_level = 0
+        self.stamina = PLAYER_SETTINGS['stamina']['max']
+        self.direction = 0
+
+    def move(self, keys, world):
+        dx, dy = 0, 0
+        if keys.get('up', False): dy -= 1
+        if keys.get('down', False): dy += 1
+        if keys.get('left', False): dx -= 1
+        if keys.get('right', False): dx += 1
+        
+        self.is_sneaking = keys.get('sneak', False)
+        self.is_sprinting = keys.get('sprint', False) and not self.is_sneaking and self.stamina > 0
+        
+        if self.is_sprinting:
+            speed = PLAYER_SETTINGS['speed']['sprint']
+            self.stamina -= PLAYER_SETTINGS['stamina']['sprint_cost'] / FPS
+        elif self.is_sneaking:
+            speed = PLAYER_SETTINGS['speed']['sneak']
+        else:
+            speed = PLAYER_SETTINGS['speed']['normal']
+            self.stamina = min(self.stamina + PLAYER_SETTINGS['stamina']['regen_rate'] / FPS, 
+                             PLAYER_SETTINGS['stamina']['max'])
+
+        if dx != 0 and dy != 0:
+            dx *= 0.7071
+            dy *= 0.7071
+        
+        movement_factor = math.sqrt(dx**2 + dy**2)
+        if self.is_sprinting:
+            self.noise_level = movement_factor * PLAYER_SETTINGS['noise']['sprint_multiplier']
+        elif self.is_sneaking:
+            self.noise_level = movement_factor * PLAYER_SETTINGS['noise']['sneak_multiplier']
+        else:
+            self.noise_level = movement_factor
+        
+        new_x = self.x + dx * speed
+        new_y = self.y + dy * speed
+        
+        if world.is_valid_position(new_x, self.y, self.radius + 2):
+            self.x = new_x
+        if world.is_valid_position(self.x, new_y, self.radius + 2):
+            self.y = new_y
+
+        if dx != 0 or dy != 0:
+            self.direction = math.degrees(math.atan2(dy, dx))
+
+
+class GuardAgent:
+    """
+    منطق الحارس (الرؤية، السمع، المطاردة، الدورية، الحركة) بدون pygame
+    الحارس المستقل يحفظ كل حالته في __slots__ كقيم بسيطة؛ حراس GuardEngine من
+    النوع EngineGuardAgent الذي يقرأ الأرقام من صفه في مصفوفات المحرك.
+    الرسم في entities.Guard أو sprites.draw_guards
+    """
+    __slots__ = ('x', 'y', 'direction', 'alert_level', 'radius', 'path_update_timer',
+                 'stuck_timer', 'max_stuck_time', 'state', 'base_speed', 'patrol_points',
+                 'current_point', 'last_known_pos', 'search_points', 'current_path',
+                 'chase_planner', 'chase_target_cell', 'path_request')
+    engine = None  # المحرك الذي يخزن أرقام الحارس (لا شيء للحارس المستقل)
+
+    def __init__(self, x, y, patrol_points=None):
+        self.x, self.y = x, y
+        self.radius = GUARD_SETTINGS['size']
+        self.base_speed = GUARD_SETTINGS['speed']['patrol']
+        self.state = "patrol"
+        self.patrol_points = patrol_points or self.generate_patrol_route()
+        self.current_point = 0
+        self.alert_level = 0
+        self.last_known_pos = None
+        self.search_points = []
+        self.direction = random.uniform(0, 360)
+        self.current_path = []
+        self.path_update_timer = 0
+        self.chase_planner = None
+        self.chase_target_cell = None
+        self.path_request = None
+        self.stuck_timer = 0
+        self.max_stuck_time = 3  # ثواني قبل اعتباره عالقاً
+
+    def update(self, player, world):
+        self.path_update_timer -= 1/FPS
+        
+        if self.path_request is not None:
+            self.poll_path_request()
+        
+        if self.state == "chase":
+            self.alert_level = min(1.0, self.alert_level + 0.05)
+            if self.check_catch_player(player, world):
+                return "caught"
+        else:
+            self.alert_level = max(0, self.alert_level - 0.01)
+
+        if self.can_see(player, world):
+            self.handle_player_detected(player, world)
+        elif self.state == "chase":
+            self.handle_lost_player(player, world)
+
+        loudness = noise_range(player)
+        if loudness:
+            if self.hearing_distance(player, loudness, world) < loudness * (1 + self.alert_level):
+                self.distract((player.x, player.y), world)
+
+        if self.current_path:
+            self.follow_path(world)
+        elif self.state == "patrol":
+            self.patrol(world)
+        elif self.state == "search":
+            self.search(world)
+
+    def can_see(self, player, world):
+        dist = distance((self.x, self.y), (player.x, player.y))
+        vision_dist = GUARD_SETTINGS['vision']['distance'] * (1 + self.alert_level * 0.5)
+        
+        if dist > vision_dist:
+            return False
+            
+        player_angle = angle_between((self.x, self.y), (player.x, player.y))
+        angle_diff = abs((player_angle - self.direction + 180) % 360 - 180)
+        vision_angle = GUARD_SETTINGS['vision']['angle'] / (2 - self.alert_level)
+        
+        if angle_diff > vision_angle:
+            return False
+            
+        # خط الرؤية أغلى فحص: فقط لمن هو ضمن المدى والمخروط
+        return world.has_line_of_sight((self.x, self.y), (player.x, player.y))
+
+    def hearing_distance(self, player, loudness, world):
+        """مسافة صوت اللاعب إلى الحارس: عبر حقل الانتشار المشترك أو خط مستقيم"""
+        if SOUND_SETTINGS['propagation']['enabled']:
+            field = NoiseField.for_world(world)
+            field.update((player.x, player.y), loudness)
+            return field.distance_at((self.x, self.y))
+        return distance((self.x, self.y), (player.x, player.y))
+
+    def check_catch_player(self, player, world):
+        dist = distance((self.x, self.y), (player.x, player.y))
+        if dist < GUARD_SETTINGS['behavior']['catch_radius']:
+            return world.has_line_of_sight((self.x, self.y), (player.x, player.y))
+        return False
+
+    def generate_patrol_route(self):
+        """إنشاء مسار دورية أكثر ذكاءً يتجنب الجدران"""
+        patrol_points = []
+        for _ in range(4):
+            angle = random.uniform(0, 2 * math.pi)
+            distance = random.randint(150, 300)
+            x = self.x + math.cos(angle) * distance
+            y = self.y + math.sin(angle) * distance
+            patrol_points.append((x, y))
+        return patrol_points
+
+    def handle_player_detected(self, player, world):
+        if self.state != "chase":
+            self.state = "chase"
+            self.alert_level = 0.5
+            
+        self.last_known_pos = (player.x, player.y)
+        
+        chase_mode = AI_SETTINGS['pathfinding']['chase_mode']
+        player_cell = world.cell_id((player.x, player.y))
+        # التخطيط التزايدي رخيص بما يكفي لمتابعة كل انتقال للاعب إلى خلية جديدة
+        moved = chase_mode == 'incremental' and player_cell != self.chase_target_cell
+        if self.path_update_timer <= 0 or moved:
+            if chase_mode != 'astar':
+                self.path_request = None  # المسار التالي من الحقل أو المخطط وليس من المجدول
+            if chase_mode == 'flow_field':
+                self.current_path = self.chase_path_from_field(player, world)
+            elif chase_mode == 'incremental':
+                if self.chase_planner is None or self.chase_planner.world is not world:
+                    self.chase_planner = ChasePlanner(world)
+                self.current_path = list(
+                    self.chase_planner.find_path((self.x, self.y), (player.x, player.y))
+                )
+            else:
+                self.request_path((player.x, player.y), world)
+            self.chase_target_cell = player_cell
+            self.path_update_timer = AI_SETTINGS['pathfinding']['update_interval']
+
+    def chase_path_from_field(self, player, world):
+        """الخطوات التالية نحو اللاعب من حقل التدفق المشترك"""
+        field = FlowField.for_world(world)
+        field.update((player.x, player.y))
+        if world.cell_id((self.x, self.y)) == field.target_id:
+            return [(player.x, player.y)]
+        
+        path = field.path_from((self.x, self.y), AI_SETTINGS['pathfinding']['flow_field_steps'])
+        if not path:
+            # خارج مدى الحقل: بحث عادي لهذا الحارس فقط
+            return list(AStar.find_path((self.x, self.y), (player.x, player.y), world))
+        if world.cell_id(path[-1]) == field.target_id:
+            path[-1] = (player.x, player.y)  # الخطوة الأخيرة إلى اللاعب نفسه
+        return path
+
+    def handle_lost_player(self, player, world):
+        if self.last_known_pos is None:
+            self.last_known_pos = (player.x, player.y)
+            
+        if distance((self.x, self.y), self.last_known_pos) < 20:
+            self.state = "investigate"
+            self.generate_search_points(world)
+        else:
+            self.state = "patrol"
+
+    def generate_search_points(self, world):
+        self.search_points = []
+        search_center = self.last_known_pos if self.last_known_pos else (self.x, self.y)
+        
+        candidates = []
+        for angle in range(0, 360, 45):
+            dist = random.uniform(
+                GUARD_SETTINGS['behavior']['search_radius'] * 0.5,
+                GUARD_SETTINGS['behavior']['search_radius'] * 1.5
+            )
+            x = search_center[0] + math.cos(math.radians(angle)) * dist
+            y = search_center[1] + math.sin(math.radians(angle)) * dist
+            candidates.append((x, y))
+        
+        # فحص كل النقاط المرشحة في استعلام واحد
+        valid = world.are_valid_positions(
+            [p[0] for p in candidates], [p[1] for p in candidates], self.radius
+        )
+        self.search_points = [p for p, ok in zip(candidates, valid) if ok]
+        
+        if not self.search_points:
+            for angle in range(0, 360, 90):
+                x = self.x + math.cos(math.radians(angle)) * 50
+                y = self.y + math.sin(math.radians(angle)) * 50
+                self.search_points.append((x, y))
+
+    def distract(self, pos, world):
+        if self.state != "chase":
+            self.state = "investigate"
+            self.request_path(pos, world)
+            self.path_update_timer = AI_SETTINGS['pathfinding']['update_interval']
+
+    def poll_path_request(self):
+        """تطبيق المسار الجديد إذا وصل من المجدول (القديم يبقى مستخدماً حتى ذلك الحين)"""
+        request = self.path_request
+        if request is not None and not request.done:
+            return
+        if request is not None:
+            self.current_path = list(request.path)
+            self.path_request = None
+            if self.engine is not None:
+                self.engine.dirty[self.index] = True
+        if self.engine is not None:
+            self.engine.waiting[self.index] = False
+
+    def request_path(self, target, world):
+        """طلب مسار عبر المجدول بأولوية حالة الحارس (أو بحث فوري إذا كان معطلاً)"""
+        settings = AI_SETTINGS['scheduler']
+        if not settings['enabled']:
+            self.current_path = list(AStar.find_path((self.x, self.y), target, world))
+            return
+        priority = settings['priorities'].get(self.state, max(settings['priorities'].values()))
+        request = AStar.scheduler.request(self, (self.x, self.y), target, world, priority)
+        if request.done:
+            self.current_path = list(request.path)
+            self.path_request = None
+        else:
+            self.path_request = request
+            if self.engine is not None:
+                self.engine.waiting[self.index] = True
+
+    def patrol(self, world):
+        if not self.patrol_points or len(self.patrol_points) < 2:
+            self.patrol_points = self.generate_patrol_route()
+            
+        target = self.patrol_points[self.current_point]
+        
+        # تتبع الوقت الذي يكون فيه الحارس عالقاً
+        if distance((self.x, self.y), target) < 10:
+            self.stuck_timer = 0
+        else:
+            self.stuck_timer += 1/FPS
+            if self.stuck_timer > self.max_stuck_time:
+                self.skip_patrol_point()
+        
+        if self.move_toward(target, world, GUARD_SETTINGS['speed']['patrol']):
+            self.arrive(world)
+
+    def skip_patrol_point(self):
+        self.current_point = (self.current_point + 1) % len(self.patrol_points)
+        self.stuck_timer = 0
+
+    def search(self, world):
+        if not self.search_points:
+            if self.last_known_pos:
+                self.generate_search_points(world)
+            else:
+                self.state = "patrol"
+            return
+            
+        target = self.search_points[0]
+        if self.move_toward(target, world, GUARD_SETTINGS['speed']['search']):
+            self.arrive(world)
+
+    def follow_path(self, world):
+        if not self.current_path:
+            return
+            
+        target = self.current_path[0]
+        if self.move_toward(target, world, self.get_speed()):
+            self.arrive(world)
+
+    def movement_target(self, world):
+        """
+        الهدف الذي يتحرك نحوه الحارس بنفس اختيار update (المسار، ثم الدورية، ثم البحث)
+        Returns:
+            (نوع الحركة، الهدف أو None، السرعة)
+        """
+        if self.current_path:
+            return MOVE_PATH, self.current_path[0], self.get_speed()
+        if self.state == "patrol":
+            if not self.patrol_points or len(self.patrol_points) < 2:
+                self.patrol_points = self.generate_patrol_route()
+            return MOVE_PATROL, self.patrol_points[self.current_point], GUARD_SETTINGS['speed']['patrol']
+        if self.state == "search":
+            if self.search_points:
+                return MOVE_SEARCH, self.search_points[0], GUARD_SETTINGS['speed']['search']
+            self.search(world)  # توليد نقاط البحث أو العودة للدورية
+        return MOVE_NONE, None, 0
+
+    def arrive(self, world):
+        """الوصول إلى الهدف الحالي (أو العجز عن التقدم نحوه)"""
+        if self.current_path:
+            self.current_path.pop(0)
+            if not self.current_path:
+                if self.state == "investigate":
+                    self.state = "search"
+        elif self.state == "patrol":
+            self.current_point = (self.current_point + 1) % len(self.patrol_points)
+            
+            # بعد كل دورة، أعد توليد المسار لمنع التكرار
+            if self.current_point == 0:
+                self.patrol_points = self.generate_patrol_route()
+        elif self.state == "search":
+            self.search_points.pop(0)
+            if not self.search_points:
+                self.state = "patrol"
+
+    def get_speed(self):
+        if self.state == "chase":
+            return GUARD_SETTINGS['speed']['chase']
+        elif self.state == "investigate":
+            return GUARD_SETTINGS['speed']['alert']
+        return self.base_speed
+
+    def move_toward(self, target, world, speed):
+        dx = target[0] - self.x
+        dy = target[1] - self.y
+        dist = math.hypot(dx, dy)
+        
+        if dist < 10:
+            return True
+            
+        # تطبيع الاتجاه مع تعديلات لتجنب الجدران
+        dx_normalized = dx / dist
+        dy_normalized = dy / dist
+        
+        # حساب الحركة مع اكتشاف العقبات مسبقاً
+        move_dist = min(speed, dist)
+        new_x = self.x + dx_normalized * move_dist
+        new_y = self.y + dy_normalized * move_dist
+        
+        # التحقق من الجدران في الاتجاهات المحتملة
+        can_move_x = world.is_valid_position(new_x, self.y, self.radius + 5)  # زيادة هامش الأمان
+        can_move_y = world.is_valid_position(self.x, new_y, self.radius + 5)
+        
+        # إذا كان عالقاً، حاول تغيير الاتجاه بشكل ذكي
+        if not can_move_x and not can_move_y:
+            for angle_offset in [45, -45, 90, -90]:
+                new_angle = math.radians(self.direction + angle_offset)
+                test_x = self.x + math.cos(new_angle) * move_dist
+                test_y = self.y + math.sin(new_angle) * move_dist
+                
+                if world.is_valid_position(test_x, test_y, self.radius + 5):
+                    new_x, new_y = test_x, test_y
+                    can_move_x = can_move_y = True
+                    break
+        
+        if can_move_x and can_move_y:
+            self.x, self.y = new_x, new_y
+        elif can_move_x:
+            self.x = new_x
+        elif can_move_y:
+            self.y = new_y
+        else:
+            return True
+            
+        # تحديث الاتجاه بحركة أكثر سلاسة
+        if dx != 0 or dy != 0:
+            target_angle = math.degrees(math.atan2(dy, dx))
+            angle_diff = (target_angle - self.direction + 180) % 360 - 180
+            self.direction += angle_diff * 0.1  # تعديل تدريجي للاتجاه
+            
+        return False
+
+
+def engine_field(name, convert=float, moves=False):
+    """خاصية تقرأ وتكتب صف الحارس في إحدى مصفوفات GuardEngine"""
+    def get(self):
+        return convert(getattr(self.engine, name)[self.index])
+
+    def set(self, value):
+        getattr(self.engine, name)[self.index] = value
+        if moves:
+            self.engine.relocate(self.index)
+
+    return property(get, set)
+
+
+class EngineGuardAgent(GuardAgent):
+    """حارس يعيش في GuardEngine: الأرقام والحالة في صفه من مصفوفات المحرك"""
+    __slots__ = ('engine', 'index')
+
+    x = engine_field('x', moves=True)
+    y = engine_field('y', moves=True)
+    direction = engine_field('direction')
+    alert_level = engine_field('alert')
+    radius = engine_field('radius', int)
+    path_update_timer = engine_field('path_timer')
+    stuck_timer = engine_field('stuck_timer')
+    max_stuck_time = engine_field('stuck_limit')
+
+    def __init__(self, x, y, patrol_points, engine):
+        self.engine = engine
+        self.index = engine.add(self)
+        super().__init__(x, y, patrol_points)
+
+    @property
+    def state(self):
+        return GUARD_STATES[self.engine.state[self.index]]
+
+    @state.setter
+    def state(self, value):
+        self.engine.state[self.index] = STATE_CODES[value]
+        self.engine.dirty[self.index] = True
+
+
+class ObjectiveAgent:
+    """حالة الهدف (الموقع، الجمع، مرحلة النبض) بدون pygame"""
+    __slots__ = ('x', 'y', 'radius', 'collected', 'pulse_timer')
+
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+        self.radius = OBJECTIVE_SETTINGS['size']
+        self.collected = False
+        self.pulse_timer = 0
+
+    def update(self):
+        if not self.collected:
+            self.pulse_timer += OBJECTIVE_SETTINGS['pulse_speed']
@@ -1,9 +1,349 @@
 import heapq
 import math
 import random
+import time
+from array import array
+from collections import OrderedDict
 from settings import *
+from .navigation import NavGraph
+from .hpa import HierarchicalPathfinder
+from .jps import JumpPointSearch
+from .routing import NextHopTable
+
+
+class PathCache:
+    """
+    ذاكرة مؤقتة LRU محدودة الحجم لنتائج A*
+    المفتاح (خلية البداية، خلية النهاية، إعدادات البحث) والقيمة مسار غير قابل للتعديل
+    تُفرغ تلقائياً عند تغير إصدار شبكة العالم
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.grid_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def sync(self, world):
+        """إفراغ الذاكرة إذا تغيرت الشبكة منذ آخر استخدام"""
+        if self.grid_version != world.grid_version:
+            if self.entries:
+                self.invalidations += 1
+                self.entries.clear()
+            self.grid_version = world.grid_version
+
+    def get(self, key):
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return path
+
+    def put(self, key, path):
+        if self.capacity <= 0:
+            return
+        self.entries[key] = path
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        """عدادات الأداء"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+KEY_SCALE = 1024  # دقة أولويات طابور A* المخزنة كأعداد صحيحة
+TYPED_ARRAYS_MIN_CELLS = 1 << 18  # من هذا العدد من الخلايا (512²) تُستخدم array بدل القوائم
+MAX_GENERATION = (1 << 30) - 1  # أختام الحالة (2 × الجيل + 1) يجب أن تتسع في array('i')
+
+
+class SearchArrays:
+    """
+    مصفوفات A* مسطحة محجوزة مرة واحدة لكل خلايا الشبكة
+    بدلاً من مسح المصفوفات قبل كل بحث يزداد رقم الجيل، وقيم الخلية صالحة
+    فقط إذا كان ختم حالتها من الجيل الحالي
+    على الخرائط الصغيرة تُستخدم قوائم بايثون لأن القراءة منها لا تنشئ كائنات
+    رقمية جديدة (أسرع بنحو 13%)، لكن كل خانة مؤشر من 8 بايت وتبقى كائنات
+    الأعداد التي كتبتها البحوث السابقة حية ويمر عليها جامع القمامة، فتصل
+    الذاكرة إلى نحو 70 بايت للخلية. من TYPED_ARRAYS_MIN_CELLS تُستخدم array
+    بحجم ثابت 16 بايت للخلية: نحو 64MB لكل نسخة على خريطة 2000×2000
+    """
+
+    def __init__(self, count):
+        self.count = count
+        if count >= TYPED_ARRAYS_MIN_CELLS:
+            self.g_score = array('d', bytes(8 * count))
+            self.came_from = array('i', [-1]) * count
+            self.state = array('i', bytes(4 * count))
+        else:
+            self.g_score = [0.0] * count
+            self.came_from = [-1] * count
+            self.state = [0] * count
+        self.generation = 0
+
+    @classmethod
+    def for_world(cls, world):
+        count = world.cols * world.rows
+        return world.get_derived(('search_arrays', count), lambda: cls(count))
+
+    def next_generation(self):
+        if self.generation == MAX_GENERATION:
+            # مسح نادر للأختام بدل تجاوز سعة array('i')
+            self.state[:] = array('i', bytes(4 * self.count)) if isinstance(self.state, array) else [0] * self.count
+            self.generation = 0
+        self.generation += 1
+        return self.generation
+
+
+class PathRequest:
+    """طلب مسار ينتظر دوره في PathScheduler؛ path جاهز عندما يصبح done صحيحاً"""
+
+    def __init__(self, owner, world, grid_start, grid_end, key, priority):
+        self.owner = owner
+        self.world = world
+        self.grid_start = grid_start
+        self.grid_end = grid_end
+        self.key = key
+        self.priority = priority
+        self.path = None
+        self.done = False
+        self.cancelled = False
+        # حالة البحث المتوقف مؤقتاً، أو نتيجة العملية العاملة المنتظرة
+        self.steps = None
+        self.arrays = None
+        self.future = None
+        self.grid_version = None
+
+    def finish(self, path):
+        self.path = path
+        self.done = True
+
+
+class PathScheduler:
+    """
+    طابور مركزي لطلبات المسارات بميزانية زمنية لكل إطار
+    الطلبات تُخدم حسب الأولوية (المطاردة قبل التحقيق قبل الدورية) ثم حسب
+    الترتيب، وكل بحث يتقدم على شرائح من الخلايا الموسعة ويتوقف عند نفاد
+    الميزانية ليتابع في الإطار التالي (الإطار قد يتجاوز الميزانية بشريحة واحدة
+    على الأكثر، انظر AStar.search_steps لما لا يُقسّم). الطلب الأعلى أولوية يسبق البحث الجاري،
+    فيبقى على الأكثر بحث متوقف واحد لكل مستوى أولوية
+    إذا رُبطت مجموعة عمليات (pool) تُرسل الطلبات إليها بنفس ترتيب الأولوية
+    ويكتفي run بجمع النتائج الجاهزة
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.queue = []
+        self.pending = {}  # صاحب الطلب -> طلبه المعلق
+        self.sequence = 0
+        self.spare_arrays = []
+        self.completed = 0
+        self.slices = 0
+        self.stale = 0
+        self.frame_ms = 0.0
+        self.max_frame_ms = 0.0
+
+    def request(self, owner, start, end, world, priority):
+        """
+        طلب مسار بين نقطتين بالبكسل
+        الطلب الجديد يلغي طلب نفس الصاحب المعلق، إلا إذا كان بين نفس الخلايا
+        Returns:
+            PathRequest - منتهٍ فوراً إذا لم يحتج المسار إلى بحث
+        """
+        path, grid_start, grid_end, key = AStar.quick_path(start, end, world)
+        old = self.pending.pop(owner, None)
+        if (path is None and old is not None and old.world is world and
+                old.grid_start == grid_start and old.grid_end == grid_end):
+            self.pending[owner] = old
+            if priority < old.priority:
+                old.priority = priority
+                self.push(old)
+            return old
+        if old is not None:
+            self.cancel(old)
+
+        request = PathRequest(owner, world, grid_start, grid_end, key, priority)
+        if path is not None:
+            request.finish(path)
+        else:
+            self.pending[owner] = request
+            self.push(request)
+        return request
+
+    def push(self, request):
+        self.sequence += 1
+        heapq.heappush(self.queue, (request.priority, self.sequence, request))
+
+    def cancel(self, request):
+        request.cancelled = True
+        self.release(request)
+        if request.future is not None:
+            # إن كان البحث قد بدأ فنتيجته تُهمل عند وصولها
+            request.future.cancel()
+            request.future = None
+            self.stale += 1
+
+    def acquire(self, world):
+        """
+        مصفوفات بحث خاصة بطلب واحد (المشتركة قد يستخدمها بحث فوري أثناء التوقف)
+        يوجد في أي لحظة نسخة لكل بحث متوقف (واحد لكل مستوى أولوية) ونسخة
+        احتياطية واحدة على الأكثر، انظر SearchArrays لحجم كل نسخة
+        """
+        count = world.cols * world.rows
+        while self.spare_arrays:
+            arrays = self.spare_arrays.pop()
+            if arrays.count == count:
+                return arrays
+        return SearchArrays(count)
+
+    def release(self, request):
+        if request.arrays is not None:
+            if not self.spare_arrays:
+                self.spare_arrays.append(request.arrays)
+            request.arrays = None
+        request.steps = None
+
+    def run(self, budget_ms):
+        """
+        متابعة الطلبات المعلقة حتى نفاد ميزانية الإطار
+        (شريحة واحدة على الأقل في كل إطار حتى لا يتوقف التقدم)
+        """
+        started = time.perf_counter()
+        if self.pool is not None:
+            self.run_workers()
+            self.frame_ms = (time.perf_counter() - started) * 1000
+            self.max_frame_ms = max(self.max_frame_ms, self.frame_ms)
+            return
+        deadline = started + budget_ms / 1000
+        slice_size = AI_SETTINGS['scheduler']['slice_expansions']
+        queue = self.queue
+        while queue:
+            priority, _, request = queue[0]
+            if request.cancelled or request.done or priority != request.priority:
+                heapq.heappop(queue)  # ملغى أو منتهٍ أو أعيد بأولوية أعلى
+                continue
+
+            world = request.world
+            if request.steps is None or request.grid_version != world.grid_version:
+                # بحث جديد، أو إعادة البحث لأن الشبكة تغيرت أثناء التوقف
+                self.release(request)
+                cache = AStar.path_cache
+                cache.sync(world)
+                path = cache.get(request.key)  # ربما حسبه طلب آخر في الأثناء
+                if path is None:
+                    request.arrays = self.acquire(world)
+                    request.grid_version = world.grid_version
+                    request.steps = AStar.search_steps(request.grid_start, request.grid_end,
+                                                       world, request.arrays, slice_size)
+                    path = AStar.resume(request.steps)
+            else:
+                path = AStar.resume(request.steps)
+            self.slices += 1
+
+            if path is not None:
+                heapq.heappop(queue)
+                self.release(request)
+                self.complete(request, path)
+            if time.perf_counter() >= deadline:
+                break
+
+        self.frame_ms = (time.perf_counter() - started) * 1000
+        self.max_frame_ms = max(self.max_frame_ms, self.frame_ms)
+
+    def run_workers(self):
+        """إرسال الطلبات الجديدة إلى العمليات العاملة وجمع النتائج المنتهية"""
+        queue = self.queue
+        while queue:
+            _, _, request = heapq.heappop(queue)
+            if not (request.cancelled or request.done or request.future is not None):
+                self.submit(request)
+
+        for request in list(self.pending.values()):
+            if request.grid_version != request.world.grid_version:
+                # الشبكة تغيرت بعد الإرسال: النتيجة القادمة قديمة
+                request.future.cancel()
+                self.stale += 1
+                self.submit(request)
+            elif request.future.done():
+                try:
+                    path = request.future.result()
+                except Exception:
+                    # عملية عاملة معطلة: البحث هنا بدلاً من فقدان الطلب
+                    path = AStar.search(request.grid_start, request.grid_end, request.world)
+                request.future = None
+                self.complete(request, path)
+
+    def submit(self, request):
+        cache = AStar.path_cache
+        cache.sync(request.world)
+        path = cache.get(request.key)  # ربما حسبه طلب آخر في الأثناء
+        if path is not None:
+            self.complete(request, path)
+            return
+        request.grid_version = request.world.grid_version
+        request.future = self.pool.submit(request)
+
+    def complete(self, request, path):
+        AStar.path_cache.put(request.key, path)
+        request.finish(path)
+        if self.pending.get(request.owner) is request:
+            del self.pending[request.owner]
+        self.completed += 1
+
+    def clear(self):
+        for request in self.pending.values():
+            self.cancel(request)
+        self.pending.clear()
+        self.queue.clear()
+
+    def shutdown(self):
+        """إلغاء الطلبات المعلقة وإيقاف العمليات العاملة"""
+        self.clear()
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def stats(self):
+        """عدادات الأداء"""
+        return {
+            'pending': len(self.pending),
+            'completed': self.completed,
+            'slices': self.slices,
+            'stale': self.stale,
+            'frame_ms': self.frame_ms,
+            'max_frame_ms': self.max_frame_ms
+        }
+
 
 class AStar:
+    path_cache = PathCache(AI_SETTINGS['pathfinding']['cache_size'])
+    scheduler = PathScheduler()
+    expanded = 0  # عدد العقد الموسعة في كل عمليات البحث (للمقارنة بين الخلفيات)
+
+    @staticmethod
+    def settings_key():
+        """كل الإعدادات التي قد تغير نتيجة البحث"""
+        return (tuple(sorted(AI_SETTINGS['pathfinding'].items())),
+                tuple(sorted(WORLD_SETTINGS['clearance'].items())),
+                WORLD_SETTINGS['line_of_sight'], WORLD_SETTINGS['pvs']['enabled'])
+
     @staticmethod
     def find_path(start, end, world):
         """
@@ -13,7 +353,20 @@ class AStar:
             end: tuple (x, y) - إحداثيات النهاية بالبكسل
             world: كائن العالم للتحقق من العوائق
         Returns:
-            list - قائمة بنقاط المسار (إحداثيات البكسل)
+            tuple - نقاط المسار (إحداثيات البكسل)، مشتركة وغير قابلة للتعديل
+        """
+        path, grid_start, grid_end, key = AStar.quick_path(start, end, world)
+        if path is None:
+            path = AStar.search(grid_start, grid_end, world)
+            AStar.path_cache.put(key, path)
+        return path
+
+    @staticmethod
+    def quick_path(start, end, world):
+        """
+        المسارات التي لا تحتاج بحثاً: نفس الخلية، خط رؤية مباشر، أو الذاكرة المؤقتة
+        Returns:
+            (المسار أو None، خلية البداية، خلية النهاية، مفتاح الذاكرة المؤقتة)
         """
         # تحويل الإحداثيات إلى خلايا الشبكة
         grid_start = (int(start[0] // world.cell_size), int(start[1] // world.cell_size))
@@ -21,54 +374,281 @@ class AStar:
 
         # حالة خاصة إذا كانت النقطتان في نفس الخلية
         if grid_start == grid_end:
-            return [end]
+            return (end,), grid_start, grid_end, None
 
         # التحقق من المسار المباشر إذا كان مفعلاً
         if (AI_SETTINGS['pathfinding']['direct_path'] and 
             world.has_line_of_sight(start, end)):
-            return [end]
-
-        # هياكل البيانات الأساسية
-        open_set = []
-        heapq.heappush(open_set, (0, grid_start))
-        came_from = {}
-        g_score = {grid_start: 0}
-        f_score = {grid_start: AStar.heuristic(grid_start, grid_end)}
-        open_set_hash = {grid_start}
+            return (end,), grid_start, grid_end, None
+
+        # المسارات بين نفس الخلايا مخزنة مسبقاً
+        cache = AStar.path_cache
+        cache.sync(world)
+        key = (grid_start, grid_end, AStar.settings_key())
+        return cache.get(key), grid_start, grid_end, key
+
+    @staticmethod
+    def search(grid_start, grid_end, world):
+        """بحث A* على رسم التنقل بين خليتين، يعيد مسار بإحداثيات العالم"""
+        steps = AStar.search_steps(grid_start, grid_end, world, SearchArrays.for_world(world))
+        return AStar.resume(steps)
+
+    @staticmethod
+    def resume(steps):
+        """
+        متابعة بحث من search_steps حتى التوقف التالي
+        Returns:
+            المسار عند انتهاء البحث، أو None إذا توقف مؤقتاً
+        """
+        try:
+            next(steps)
+        except StopIteration as finished:
+            return finished.value
+        return None
+
+    @staticmethod
+    def search_steps(grid_start, grid_end, world, arrays, slice_size=0):
+        """
+        بحث A* قابل للإيقاف (مولد): يتوقف بعد كل slice_size خلية موسعة
+        (0 = بدون توقف) ويعيد المسار عند الانتهاء
+        arrays: مصفوفات البحث التي يملكها هذا البحث حتى ينتهي
+        خلفيتا 'hpa' و 'jps' تتوقفان بنفس الطريقة (عقدة موسعة أو قفزة لكل وحدة).
+        لا يُقسّم: قراءة جدول 'table' (بايت لكل خلية في المسار، بدون بحث)،
+        وتجانس المسار في finish_path الذي يعمل في الشريحة الأخيرة من أي خلفية
+        """
+
+        # رسم التنقل المحسوب مسبقاً: جيران صالحة وتكاليف جاهزة لكل خلية
+        graph = NavGraph.for_world(world)
+        offsets, targets, costs = graph.offsets, graph.targets, graph.costs
+        cols = graph.cols
+        max_length = AI_SETTINGS['pathfinding']['max_length']
+        if not (0 <= grid_start[0] < graph.cols and 0 <= grid_start[1] < graph.rows):
+            return ()
+        start_id = graph.cell_id(grid_start)
+        end_id = graph.cell_id(grid_end)
         
-        while open_set and len(came_from) < AI_SETTINGS['pathfinding']['max_length']:
-            current = heapq.heappop(open_set)[1]
-            open_set_hash.remove(current)
-
-            if current == grid_end:
-                path = AStar.reconstruct_path(came_from, current)
-                if AI_SETTINGS['pathfinding']['smoothing']:
-                    path = AStar.smooth_path(path, world)
-                return AStar.convert_to_world(path, world.cell_size)
-
-            for neighbor in world.get_neighbors(current):
-                if not AStar.is_valid_cell(neighbor, world):
+        backend = AI_SETTINGS['pathfinding']['backend']
+        if backend == 'hpa':
+            if not (0 <= grid_end[0] < graph.cols and 0 <= grid_end[1] < graph.rows):
+                return ()
+            cells = yield from HierarchicalPathfinder.for_world(world).path_steps(
+                start_id, end_id, arrays, slice_size
+            )
+            if slice_size:
+                yield  # التجانس في شريحة خاصة به بعد فحص الوقت
+            return AStar.finish_path([graph.cell(c) for c in cells] if cells else [], world)
+        if backend == 'table':
+            table = NextHopTable.for_world(world)
+            if table is not None and 0 <= grid_end[0] < graph.cols and 0 <= grid_end[1] < graph.rows:
+                cells = table.find_path(start_id, end_id)
+                if cells is not None:
+                    return AStar.finish_path([graph.cell(c) for c in cells], world)
+            # خريطة أكبر من الجدول أو خلية خارجه: بحث A* عادي
+        if backend == 'jps':
+            cells, expanded = yield from JumpPointSearch.for_world(world).path_steps(
+                start_id, end_id, max_length, slice_size
+            )
+            AStar.expanded += expanded
+            if slice_size:
+                yield
+            return AStar.finish_path([graph.cell(c) for c in cells], world)
+        end_x, end_y = grid_end
+        diagonal_factor = math.sqrt(2) - 2
+
+        # مصفوفات مسطحة مفهرسة برقم الخلية؛ ختم الحالة يحدد صلاحية القيم:
+        # أقل من seen_mark = لم تُزر في هذا البحث، open_mark = في الطابور
+        seen_mark = arrays.next_generation() * 2
+        open_mark = seen_mark + 1
+        g_score, came_from, state = arrays.g_score, arrays.came_from, arrays.state
+        g_score[start_id] = 0.0
+        came_from[start_id] = -1
+        state[start_id] = open_mark
+
+        # عناصر الطابور أعداد صحيحة: int(f * KEY_SCALE) * count + رقم الخلية
+        count = arrays.count
+        open_set = [start_id]
+        discovered = 0
+        expanded = 0
+        pause_at = slice_size or -1
+        while open_set and discovered < max_length:
+            if expanded == pause_at:
+                pause_at += slice_size
+                yield  # متابعة في الإطار التالي
+            current = heapq.heappop(open_set) % count
+            state[current] = seen_mark
+            expanded += 1
+
+            if current == end_id:
+                break
+
+            # اتجاه الوصول إلى الخلية الحالية لعقوبة تغيير الاتجاه (0 للبداية)
+            prev = came_from[current]
+            direction = current - prev if prev >= 0 else 0
+            current_g = g_score[current]
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[i]
+
+                # حساب التكلفة مع عقوبة الجدران القريبة (محسوبة مسبقاً)
+                tentative_g = current_g + costs[i]
+                if direction and neighbor - current != direction:
+                    tentative_g += 0.2
+
+                mark = state[neighbor]
+                if mark < seen_mark:
+                    discovered += 1
+                elif tentative_g >= g_score[neighbor]:
                     continue
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g
+                if mark != open_mark:
+                    dx = neighbor % cols - end_x
+                    dy = neighbor // cols - end_y
+                    if dx < 0:
+                        dx = -dx
+                    if dy < 0:
+                        dy = -dy
+                    f = tentative_g + dx + dy + diagonal_factor * (dx if dx < dy else dy)
+                    heapq.heappush(open_set, int(f * KEY_SCALE) * count + neighbor)
+                    state[neighbor] = open_mark
+
+        AStar.expanded += expanded
+
+        # عند الفشل في إيجاد مسار كامل، إرجاع أفضل مسار جزئي
+        if discovered:
+            path = [current]
+            while came_from[path[-1]] >= 0:
+                path.append(came_from[path[-1]])
+            path.reverse()
+            if slice_size:
+                yield
+            return AStar.finish_path([graph.cell(c) for c in path], world)
 
-                # حساب التكلفة مع عقوبة الجدران القريبة
-                tentative_g = g_score[current] + AStar.calculate_cost(current, neighbor, world, came_from)
+        return ()  # لا يوجد مسار ممكن
 
-                if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g
-                    f_score[neighbor] = tentative_g + AStar.heuristic(neighbor, grid_end)
-                    if neighbor not in open_set_hash:
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                        open_set_hash.add(neighbor)
+    @staticmethod
+    def finish_path(path, world):
+        """تجانس مسار الخلايا (إذا كان مفعلاً) وتحويله إلى إحداثيات العالم"""
+        if not path:
+            return ()
+        smoothing = AI_SETTINGS['pathfinding']['smoothing']
+        if smoothing == 'line_of_sight':
+            path = AStar.smooth_path(path, world)
+        elif smoothing:
+            # نفس هامش الحركة في GuardAgent.move_toward + حجم عينة حقل المسافة
+            margin = GUARD_SETTINGS['size'] + 5 + world.get_clearance().resolution
+            return tuple(AStar.string_pull(path, world, margin))
+        return tuple(AStar.convert_to_world(path, world.cell_size))
+
+    @staticmethod
+    def string_pull(path, world, margin):
+        """
+        شد المسار داخل ممر الخلايا (خوارزمية القمع البسيطة)
+        كل انتقال بين خليتين بوابة: الحافة المشتركة، أو الزاوية المشتركة في الحركة
+        القطرية. الناتج أقصر خط يمر بكل البوابات، في مرور واحد تقريباً وبدون أي
+        فحص لخط الرؤية
+        Args:
+            path: خلايا الشبكة المتجاورة من A*
+            margin: أقل مسافة بين المسار وزوايا الجدران
+        Returns:
+            list - نقاط المسار بإحداثيات العالم
+        """
+        cs = world.cell_size
+        start = AStar.grid_to_world(path[0], cs)
+        end = AStar.grid_to_world(path[-1], cs)
+        if len(path) < 3:
+            return [start, end][len(path) == 1:]
+
+        cols, rows, occupancy = world.cols, world.rows, world.occupancy
+
+        def touches_wall(vx, vy):
+            """هل تلمس زاوية الخلايا (vx, vy) جداراً أو حد الخريطة"""
+            for x, y in ((vx - 1, vy - 1), (vx, vy - 1), (vx - 1, vy), (vx, vy)):
+                if not (0 <= x < cols and 0 <= y < rows) or occupancy[y * cols + x]:
+                    return True
+            return False
+
+        # طرف البوابة عند زاوية جدار يُبعد عنها margin×√2 (أو إلى منتصف الحافة)
+        # فيبقى أي خط يقطع بوابتين حول الزاوية على بعد margin منها على الأقل
+        half = cs / 2
+        shrink = min(half, margin * math.sqrt(2))
+
+        def endpoint(vx, vy, mx, my):
+            if not touches_wall(vx, vy):
+                return (vx * cs, vy * cs)
+            return (vx * cs + (mx - vx * cs) * shrink / half,
+                    vy * cs + (my - vy * cs) * shrink / half)
+
+        # البوابات (يسار، يمين) بالنسبة لاتجاه الحركة
+        portals = [(start, start)]
+        previous = (0, 0)
+        for (ax, ay), (bx, by) in zip(path, path[1:]):
+            dx, dy = bx - ax, by - ay
+            if dx and dy:
+                corner = ((ax + (dx > 0)) * cs, (ay + (dy > 0)) * cs)
+                portals.append((corner, corner))
+            else:
+                # منعطف حول زاوية جدار في ممر ضيق (الهامش لا يتسع): المرور بمركز الخلية
+                if (shrink < margin * math.sqrt(2) and previous[0] * dx + previous[1] * dy == 0
+                        and not (previous[0] and previous[1]) and previous != (0, 0)):
+                    ux, uy = dx - previous[0], dy - previous[1]
+                    if touches_wall(ax + (ux > 0), ay + (uy > 0)):
+                        center = AStar.grid_to_world((ax, ay), cs)
+                        portals.append((center, center))
+
+                # طرفا الحافة المشتركة بإحداثيات زوايا الخلايا
+                mx, my = (ax + 0.5 + dx / 2) * cs, (ay + 0.5 + dy / 2) * cs
+                left_x, left_y = ax + (dx > 0) + (dy < 0), ay + (dy > 0) + (dx > 0)
+                right_x, right_y = ax + (dx > 0) + (dy > 0), ay + (dy > 0) + (dx < 0)
+                portals.append((endpoint(left_x, left_y, mx, my),
+                                endpoint(right_x, right_y, mx, my)))
+            previous = (dx, dy)
+        portals.append((end, end))
+
+        def area(a, b, c):
+            """ضعف المساحة الموجهة للمثلث (إشارتها تحدد جهة c من الخط ab)"""
+            return (c[0] - a[0]) * (b[1] - a[1]) - (b[0] - a[0]) * (c[1] - a[1])
+
+        points = [start]
+        apex = left = right = start
+        apex_index = left_index = right_index = 0
+        i = 1
+        while i < len(portals):
+            portal_left, portal_right = portals[i]
+
+            # تضييق الجهة اليمنى من القمع
+            if area(apex, right, portal_right) <= 0:
+                if apex == right or area(apex, left, portal_right) > 0:
+                    right, right_index = portal_right, i
+                else:
+                    # اليمين تجاوز اليسار: زاوية اليسار نقطة جديدة في المسار
+                    points.append(left)
+                    apex = right = left
+                    apex_index = right_index = left_index
+                    i = apex_index + 1
+                    continue
+
+            # تضييق الجهة اليسرى من القمع
+            if area(apex, left, portal_left) >= 0:
+                if apex == left or area(apex, right, portal_left) < 0:
+                    left, left_index = portal_left, i
+                else:
+                    points.append(right)
+                    apex = left = right
+                    apex_index = left_index = right_index
+                    i = apex_index + 1
+                    continue
+            i += 1
 
-        # إذا فشل في إيجاد مسار كامل، إرجاع أفضل مسار جزئي
-        if came_from:
-            path = AStar.reconstruct_path(came_from, current)
-            if AI_SETTINGS['pathfinding']['smoothing']:
-                path = AStar.smooth_path(path, world)
-            return AStar.convert_to_world(path, world.cell_size)
+        if points[-1] != end:
+            points.append(end)
 
-        return []  # لا يوجد مسار ممكن
+        # البوابات المنطبقة على نقطة واحدة تترك نقاطاً على استقامة واحدة
+        taut = [points[0]]
+        for point, following in zip(points[1:], points[2:]):
+            if area(taut[-1], point, following) != 0:
+                taut.append(point)
+        taut.append(points[-1])
+        return taut
 
     @staticmethod
     def is_valid_cell(cell, world):
@@ -84,13 +664,11 @@ class AStar:
         base_cost = 1.0
         x, y = neighbor
         
-        # عقوبة الجدران المجاورة
+        # عقوبة الجدران المجاورة (محسوبة مسبقاً مع حقل المسافة)
         wall_penalty = 0.0
-        for dx, dy in [(0,1), (1,0), (0,-1), (-1,0)]:
-            nx, ny = x + dx, y + dy
-            if 0 <= nx < len(world.grid[0]) and 0 <= ny < len(world.grid):
-                if world.grid[ny][nx] == 1:
-                    wall_penalty += AI_SETTINGS['pathfinding']['wall_avoidance']
+        if 0 <= x < world.cols and 0 <= y < world.rows:
+            wall_penalty = (world.get_clearance().adjacent_walls[y, x] *
+                            AI_SETTINGS['pathfinding']['wall_avoidance'])
 
         # عقوبة تغيير الاتجاه المفاجئ
         direction_penalty = 0.0
@@ -167,4 +745,246 @@ class AStar:
             y = position[1] + math.sin(angle) * dist
             if world.is_valid_position(x, y, PLAYER_SETTINGS['size'] + 5):
                 return (x, y)
-        return position
\ No newline at end of file
+        return position
+
+
+class FlowField:
+    """
+    حقل تدفق مشترك نحو هدف واحد (اللاعب)
+    بحث Dijkstra واحد من خلية الهدف عند تغيرها، ثم كل حارس يقرأ
+    الخطوة التالية من خليته مباشرة في O(1) مهما كان عدد الحراس
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.graph = NavGraph.for_world(world)
+        count = self.graph.cols * self.graph.rows
+        self.cost = array('d', [math.inf]) * count
+        self.next_hop = array('q', [-1]) * count
+        self.touched = []
+        self.target_id = None
+        self.updates = 0
+
+    @classmethod
+    def for_world(cls, world):
+        """الحقل المشترك للعالم (يعاد إنشاؤه عند تغير الشبكة)"""
+        return world.get_derived('chase_flow_field', lambda: cls(world))
+
+    def update(self, target):
+        """إعادة الحساب فقط إذا انتقل الهدف إلى خلية أخرى"""
+        target_id = self.world.cell_id(target)
+        if target_id == self.target_id:
+            return
+        self.target_id = target_id
+        self.updates += 1
+
+        # مسح الخلايا التي لمسها البحث السابق فقط
+        cost, next_hop = self.cost, self.next_hop
+        for cell in self.touched:
+            cost[cell] = math.inf
+            next_hop[cell] = -1
+        self.touched = touched = []
+        if target_id is None:
+            return
+
+        graph = self.graph
+        offsets, targets, enter_costs = graph.offsets, graph.targets, graph.enter_costs
+        max_cost = AI_SETTINGS['pathfinding']['flow_field_max_cost']
+
+        # الجوار متماثل: الانتقال من الجار إلى current يكلف عقوبة current
+        cost[target_id] = 0.0
+        touched.append(target_id)
+        frontier = [(0.0, target_id)]
+        while frontier:
+            current_cost, current = heapq.heappop(frontier)
+            if current_cost > cost[current]:
+                continue
+            step_cost = current_cost + enter_costs[current]
+            if step_cost > max_cost:
+                continue
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[i]
+                if step_cost < cost[neighbor]:
+                    if cost[neighbor] == math.inf:
+                        touched.append(neighbor)
+                    cost[neighbor] = step_cost
+                    next_hop[neighbor] = current
+                    heapq.heappush(frontier, (step_cost, neighbor))
+
+    def path_from(self, position, steps):
+        """
+        أول خطوات المسار من موقع نحو الهدف (إحداثيات العالم)
+        Returns:
+            list - فارغة إذا كان الموقع خارج مدى الحقل
+        """
+        cell = self.world.cell_id(position)
+        if cell is None or self.cost[cell] == math.inf:
+            return []
+        path = []
+        while len(path) < steps and cell != self.target_id:
+            cell = self.next_hop[cell]
+            path.append(self.world.get_cell_center(self.graph.cell(cell)))
+        return path
+
+
+class ChasePlanner:
+    """
+    مخطط مطاردة تزايدي لحارس واحد (على طريقة FRA* / MT-D* Lite)
+    شجرة بحث A* جذرها خلية الحارس تبقى بين عمليات إعادة التخطيط:
+    - إذا انتقل الهدف إلى خلية مغلقة في الشجرة فالمسار جاهز بدون أي بحث
+    - وإلا يكمل البحث من حيث توقف؛ مفاتيح القائمة المفتوحة لا يعاد حسابها بل
+      تُصحح عند سحبها باستخدام km كما في D* Lite
+    - إذا تحرك الحارس خارج مسار الشجرة إلى الهدف تبقى الشجرة الفرعية تحته فقط
+    الاستدلال (مسافة تشيبيشيف، كل خطوة تكلف 1 على الأقل) متسق، فقيم g للخلايا
+    المغلقة تبقى صحيحة مهما تغير الهدف
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.graph = None
+        self.target = None
+        self.expanded = 0
+        self.replans = 0
+        self.reroots = 0
+        self.reset(None)
+
+    def reset(self, root):
+        """شجرة جديدة من خلية واحدة"""
+        self.root = root
+        self.g = {} if root is None else {root: 0.0}
+        self.parent = {}
+        self.closed = set()
+        self.open = [] if root is None else [(0.0, 0.0, root)]
+        self.target = None
+        self.km = 0
+
+    def reroot(self, start):
+        """الإبقاء على الشجرة الفرعية تحت start فقط ونقل الجذر إليها"""
+        parent = self.parent
+        inside = {start: True, self.root: False}
+        for cell in self.closed:
+            chain = []
+            while cell not in inside:
+                chain.append(cell)
+                cell = parent[cell]
+            for visited in chain:
+                inside[visited] = inside[cell]
+
+        # مسار جزئي من مسار أقصر هو أقصر مسار أيضاً: القيم تنزاح فقط
+        base = self.g[start]
+        closed = {cell for cell in self.closed if inside[cell]}
+        g = {cell: self.g[cell] - base for cell in closed}
+        parent = {cell: parent[cell] for cell in closed if cell != start}
+
+        # الحافة المفتوحة الجديدة: جيران الشجرة الفرعية خارجها
+        offsets, targets, costs = self.graph.offsets, self.graph.targets, self.graph.costs
+        for cell in closed:
+            cell_g = g[cell]
+            for i in range(offsets[cell], offsets[cell + 1]):
+                neighbor = targets[i]
+                if neighbor not in closed and cell_g + costs[i] < g.get(neighbor, math.inf):
+                    g[neighbor] = cell_g + costs[i]
+                    parent[neighbor] = cell
+
+        self.root = start
+        self.g, self.parent, self.closed = g, parent, closed
+        self.open = None  # تُبنى القائمة المفتوحة من جديد في search
+        self.reroots += 1
+
+    def plan(self, start, target):
+        """
+        مسار الخلايا من start إلى target (أرقام خلايا)
+        Returns:
+            list - من البداية إلى الهدف، أو إلى آخر خلية وصلها البحث إذا
+            تجاوز max_length (مثل A*)
+        """
+        graph = NavGraph.for_world(self.world)
+        if graph is not self.graph:
+            self.graph = graph  # تغيرت الشبكة أو الإعدادات
+            self.reset(start)
+        elif start not in self.closed:
+            self.reset(start)
+        self.replans += 1
+
+        # إذا كان الحارس على مسار الشجرة إلى الهدف فباقي المسار هو الأقصر منه
+        # ولا حاجة لنقل الجذر
+        path = self.search(target)
+        if start in path:
+            return path[path.index(start):]
+        self.reroot(start)
+        return self.search(target)
+
+    def search(self, target):
+        """إكمال البحث حتى يُغلق الهدف، ثم المسار من الجذر إليه"""
+        graph = self.graph
+        cols = graph.cols
+        g, parent, closed = self.g, self.parent, self.closed
+        target_x, target_y = target % cols, target // cols
+        if self.target is not None and target != self.target:
+            # h يتغير بمقدار حركة الهدف على الأكثر، فالمفاتيح القديمة + km حد أدنى
+            self.km += max(abs(self.target % cols - target_x), abs(self.target // cols - target_y))
+        self.target = target
+        km = self.km
+        if self.open is None:
+            # الأعمق أولاً عند تساوي المفاتيح
+            self.open = [
+                (cost + max(abs(cell % cols - target_x), abs(cell // cols - target_y)) + km,
+                 -cost, cell)
+                for cell, cost in g.items() if cell not in closed
+            ]
+            heapq.heapify(self.open)
+
+        open_set = self.open
+        offsets, targets, costs = graph.offsets, graph.targets, graph.costs
+        budget = AI_SETTINGS['pathfinding']['max_length']
+        end = target
+        while target not in closed:
+            if not open_set or budget <= 0:
+                break
+            key, neg_g, current = heapq.heappop(open_set)
+            if current in closed or -neg_g != g[current]:
+                continue  # مدخل قديم
+            current_key = (-neg_g + max(abs(current % cols - target_x),
+                                        abs(current // cols - target_y)) + km)
+            if key < current_key:
+                heapq.heappush(open_set, (current_key, neg_g, current))
+                continue  # مفتاح محسوب لهدف سابق
+            closed.add(current)
+            end = current
+            budget -= 1
+            self.expanded += 1
+            current_g = -neg_g
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[i]
+                tentative_g = current_g + costs[i]
+                if neighbor not in closed and tentative_g < g.get(neighbor, math.inf):
+                    g[neighbor] = tentative_g
+                    parent[neighbor] = current
+                    h = max(abs(neighbor % cols - target_x), abs(neighbor // cols - target_y))
+                    heapq.heappush(open_set, (tentative_g + h + km, -tentative_g, neighbor))
+
+        if end not in closed:
+            end = self.root
+        path = [end]
+        while path[-1] != self.root:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return path
+
+    def find_path(self, start, end):
+        """نفس صيغة AStar.find_path (إحداثيات العالم) باستخدام الشجرة المحفوظة"""
+        world = self.world
+        start_id = world.cell_id(start)
+        end_id = world.cell_id(end)
+        if start_id is None or end_id is None:
+            return ()
+        if start_id == end_id:
+            return (end,)
+        if (AI_SETTINGS['pathfinding']['direct_path'] and
+                world.has_line_of_sight(start, end)):
+            return (end,)
+        graph = NavGraph.for_world(world)
+        cells = self.plan(start_id, end_id)
+        if len(cells) < 2:
+            return ()
+        return AStar.finish_path([graph.cell(c) for c in cells], world)
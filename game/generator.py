@@ -0,0 +1,98 @@
+import argparse
+import numpy as np
+from .levels import save_level, DEFAULT_CHUNK_SIZE
+
+
+def generate_level(cols, rows, seed=None, corridor_density=1.0, rooms=0, loops=0.0,
+                   room_size=(3, 8)):
+    """
+    توليد خريطة متاهة متوافقة مع World بسرعة (عمليات NumPy متجهة)
+    Args:
+        cols, rows: أبعاد الخريطة بالخلايا (5 على الأقل)
+        seed: بذرة العشوائية لإعادة إنتاج نفس الخريطة
+        corridor_density: كثافة الممرات (0-1]؛ 1 = ممر كل خليتين، والقيم
+                          الأقل تباعد الممرات وتزيد سماكة الجدران
+        rooms: عدد الغرف المستطيلة المفتوحة
+        loops: احتمال فتح ممر إضافي عند كل تقاطع (حلقات بدل الطرق المسدودة)
+        room_size: (أدنى، أقصى) طول ضلع الغرفة بالخلايا
+    Returns:
+        np.ndarray (rows, cols) من النوع uint8:
+        1 = جدار، 0 = أرضية، 2 = البداية، 3 = النهاية
+    """
+    if cols < 5 or rows < 5:
+        raise ValueError("أبعاد الخريطة يجب أن تكون 5×5 على الأقل")
+    if not 0 < corridor_density <= 1:
+        raise ValueError("corridor_density يجب أن تكون بين 0 و 1")
+
+    rng = np.random.default_rng(seed)
+    grid = np.ones((rows, cols), dtype=np.uint8)
+
+    # عقد المتاهة على شبكة منتظمة بخطوة stride داخل الإطار الخارجي
+    # (عقدتان على الأقل في المحور الأطول حتى لا تنطبق البداية على النهاية)
+    stride = max(2, min(int(round(2 / corridor_density)), max(cols, rows) - 3))
+    nodes_x = (cols - 3) // stride + 1
+    nodes_y = (rows - 3) // stride + 1
+    xs = 1 + np.arange(nodes_x) * stride
+    ys = 1 + np.arange(nodes_y) * stride
+    node_x, node_y = np.meshgrid(xs, ys)
+    grid[node_y, node_x] = 0
+
+    # متاهة الشجرة الثنائية: كل عقدة تتصل بجارتها الشمالية أو الغربية
+    # النتيجة شجرة ممتدة، فكل العقد متصلة ببعضها
+    go_north = rng.random(node_x.shape) < 0.5
+    go_north[:, 0] = True
+    go_north[0, :] = False
+    go_west = ~go_north
+    go_west[0, 0] = False
+
+    # الحلقات: فتح الاتجاه الآخر أيضاً
+    if loops > 0:
+        extra = rng.random(node_x.shape) < loops
+        go_north |= extra
+        go_west |= extra
+        go_north[0, :] = False
+        go_west[:, 0] = False
+
+    for step in range(1, stride):
+        grid[node_y[go_north] - step, node_x[go_north]] = 0
+        grid[node_y[go_west], node_x[go_west] - step] = 0
+
+    # الغرف: مستطيلات بعرض stride على الأقل لتحتوي عقدة واحدة على الأقل
+    # (وبالتالي تبقى متصلة بالمتاهة)
+    if rooms > 0:
+        low = max(room_size[0], stride)
+        high = max(room_size[1], low)
+        widths = rng.integers(low, high + 1, rooms).clip(max=cols - 2)
+        heights = rng.integers(low, high + 1, rooms).clip(max=rows - 2)
+        lefts = rng.integers(1, cols - 1 - widths + 1)
+        tops = rng.integers(1, rows - 1 - heights + 1)
+        for left, top, width, height in zip(lefts, tops, widths, heights):
+            grid[top:top + height, left:left + width] = 0
+
+    # البداية في أول عقدة والنهاية في آخر عقدة (في الزاوية المقابلة)
+    grid[ys[0], xs[0]] = 2
+    grid[ys[-1], xs[-1]] = 3
+    return grid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="توليد ملف مستوى عشوائي")
+    parser.add_argument('path')
+    parser.add_argument('cols', type=int)
+    parser.add_argument('rows', type=int)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--corridor-density', type=float, default=1.0)
+    parser.add_argument('--rooms', type=int, default=0)
+    parser.add_argument('--loops', type=float, default=0.0)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    grid = generate_level(
+        args.cols, args.rows, seed=args.seed,
+        corridor_density=args.corridor_density, rooms=args.rooms, loops=args.loops
+    )
+    save_level(args.path, grid, chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
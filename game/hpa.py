@@ -0,0 +1,356 @@
+import heapq
+import math
+from settings import *
+from .navigation import NavGraph
+
+
+class HierarchicalPathfinder:
+    """
+    بحث هرمي (HPA*) للخرائط الكبيرة
+    الشبكة مقسمة إلى مجموعات مربعة، والمداخل بين المجموعات المتجاورة تشكل
+    رسماً مجرداً صغيراً. البحث يتم على الرسم المجرد أولاً ثم يُفصّل المسار
+    بـ A* محصور في ممر المجموعات التي يمر بها. الرسم المجرد يُبنى عند تحميل
+    العالم (World) إذا كانت الخلفية 'hpa'
+    """
+
+    def __init__(self, world, cluster_size):
+        self.world = world
+        self.graph = NavGraph.for_world(world)
+        self.cluster_size = cluster_size
+        self.cols = self.graph.cols
+        self.rows = self.graph.rows
+        self.clusters_x = -(-self.cols // cluster_size)
+        self.clusters_y = -(-self.rows // cluster_size)
+
+        # عقد الرسم المجرد لكل مجموعة، وحواف الانتقال بين المجموعات والحواف داخلها
+        self.cluster_nodes = {}
+        self.inter_edges = {}
+        self.intra_edges = {}
+        self.build_entrances()
+        for cluster in self.cluster_nodes:
+            self.intra_edges[cluster] = self.build_cluster_edges(cluster)
+
+    @classmethod
+    def for_world(cls, world):
+        """الباحث الهرمي المخزن للعالم (يعاد بناؤه عند تغير الشبكة)"""
+        graph = NavGraph.for_world(world)
+        cluster_size = AI_SETTINGS['pathfinding']['hpa_cluster_size']
+        return world.get_derived(('hpa', id(graph), cluster_size),
+                                 lambda: cls(world, cluster_size))
+
+    def cluster_of(self, cell):
+        x, y = cell % self.cols, cell // self.cols
+        return (y // self.cluster_size) * self.clusters_x + x // self.cluster_size
+
+    def cluster_bounds(self, cluster):
+        """(x0, y0, x1, y1) حدود المجموعة بالخلايا (x1, y1 غير مشمولة)"""
+        cs = self.cluster_size
+        x0 = (cluster % self.clusters_x) * cs
+        y0 = (cluster // self.clusters_x) * cs
+        return x0, y0, min(x0 + cs, self.cols), min(y0 + cs, self.rows)
+
+    def has_edge(self, a, b):
+        graph = self.graph
+        for i in range(graph.offsets[a], graph.offsets[a + 1]):
+            if graph.targets[i] == b:
+                return True
+        return False
+
+    def add_transition(self, a, b):
+        """ربط خليتين متجاورتين على حدود مجموعتين في الرسم المجرد"""
+        for node in (a, b):
+            nodes = self.cluster_nodes.setdefault(self.cluster_of(node), [])
+            if node not in nodes:
+                nodes.append(node)
+        enter = self.graph.enter_costs
+        self.inter_edges.setdefault(a, []).append((b, enter[b]))
+        self.inter_edges.setdefault(b, []).append((a, enter[a]))
+
+    def build_entrances(self):
+        """
+        إيجاد المداخل على كل حد بين مجموعتين: كل سلسلة متصلة من الخلايا
+        المفتوحة على الجانبين تعطي انتقالاً في وسطها، أو اثنين عند طرفيها إذا طالت
+        """
+        cs = self.cluster_size
+        cols, rows = self.cols, self.rows
+
+        def scan(pairs):
+            run = []
+            for pair in pairs + [None]:
+                if pair is not None and self.has_edge(*pair) and self.has_edge(*pair[::-1]):
+                    run.append(pair)
+                    continue
+                if run:
+                    if len(run) < 6:
+                        self.add_transition(*run[len(run) // 2])
+                    else:
+                        self.add_transition(*run[0])
+                        self.add_transition(*run[-1])
+                    run = []
+
+        # حدود عمودية بين مجموعات متجاورة أفقياً
+        for x in range(cs, cols, cs):
+            for y0 in range(0, rows, cs):
+                scan([(y * cols + x - 1, y * cols + x) for y in range(y0, min(y0 + cs, rows))])
+        # حدود أفقية بين مجموعات متجاورة عمودياً
+        for y in range(cs, rows, cs):
+            for x0 in range(0, cols, cs):
+                scan([((y - 1) * cols + x, y * cols + x) for x in range(x0, min(x0 + cs, cols))])
+
+    def local_search(self, start, bounds, goals=None, goal=None, reverse=False):
+        """
+        Dijkstra (أو A* عند تحديد goal) محصور داخل حدود مجموعة واحدة
+        Args:
+            start: رقم خلية البداية
+            bounds: (x0, y0, x1, y1)
+            goals: مجموعة خلايا نريد تكاليفها (يتوقف عند الوصول لكلها)
+            goal: خلية هدف واحدة (يعيد المسار إليها)
+            reverse: حساب تكلفة الوصول من كل خلية إلى start بدلاً من العكس
+        Returns:
+            (dist, came_from)
+        """
+        graph = self.graph
+        offsets, targets, costs = graph.offsets, graph.targets, graph.costs
+        enter = graph.enter_costs
+        cols = self.cols
+        x0, y0, x1, y1 = bounds
+        goal_x = goal % cols if goal is not None else 0
+        goal_y = goal // cols if goal is not None else 0
+        remaining = set(goals) if goals else set()
+        remaining.discard(start)
+
+        dist = {start: 0.0}
+        came_from = {}
+        frontier = [(0.0, 0.0, start)]
+        while frontier:
+            _, current_cost, current = heapq.heappop(frontier)
+            if current_cost > dist[current]:
+                continue
+            if current == goal:
+                break
+            if remaining:
+                remaining.discard(current)
+                if not remaining and goal is None:
+                    break
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[i]
+                nx, ny = neighbor % cols, neighbor // cols
+                if not (x0 <= nx < x1 and y0 <= ny < y1):
+                    continue
+                # في الاتجاه العكسي: الانتقال من neighbor إلى current يكلف دخول current
+                new_cost = current_cost + (enter[current] if reverse else costs[i])
+                if new_cost < dist.get(neighbor, math.inf):
+                    dist[neighbor] = new_cost
+                    came_from[neighbor] = current
+                    estimate = new_cost
+                    if goal is not None:
+                        dx, dy = abs(nx - goal_x), abs(ny - goal_y)
+                        estimate += (dx + dy) + (math.sqrt(2) - 2) * min(dx, dy)
+                    heapq.heappush(frontier, (estimate, new_cost, neighbor))
+        return dist, came_from
+
+    def build_cluster_edges(self, cluster):
+        """
+        الحواف الداخلية بين عقد المجموعة: Dijkstra من كل عقدة على رسم محلي
+        مضغوط (أرقام محلية وقوائم جيران) بدلاً من الرسم الكامل. تكلفة الحافة
+        هي دخول الخلية الهدف، فالاتجاه العكسي لأي زوج لا يحتاج بحثاً:
+        d(b, a) = d(a, b) - enter[b] + enter[a]
+        """
+        nodes = self.cluster_nodes[cluster]
+        edges = {node: [] for node in nodes}
+        if len(nodes) < 2:
+            return edges
+        graph = self.graph
+        offsets, targets, costs = graph.offsets, graph.targets, graph.costs
+        enter = graph.enter_costs
+        cols = self.cols
+        x0, y0, x1, y1 = self.cluster_bounds(cluster)
+
+        cells = [y * cols + x for y in range(y0, y1) for x in range(x0, x1)]
+        local = {cell: i for i, cell in enumerate(cells)}
+        neighbors = []
+        for cell in cells:
+            neighbors.append([(local[targets[i]], costs[i])
+                              for i in range(offsets[cell], offsets[cell + 1])
+                              if targets[i] in local])
+
+        inf = math.inf
+        node_ids = [local[node] for node in nodes]
+        for k, (node, source) in enumerate(zip(nodes, node_ids)):
+            wanted = set(node_ids[k + 1:])
+            if not wanted:
+                break
+            dist = [inf] * len(cells)
+            dist[source] = 0.0
+            frontier = [(0.0, source)]
+            while frontier and wanted:
+                cost, current = heapq.heappop(frontier)
+                if cost > dist[current]:
+                    continue
+                wanted.discard(current)
+                for neighbor, step in neighbors[current]:
+                    new_cost = cost + step
+                    if new_cost < dist[neighbor]:
+                        dist[neighbor] = new_cost
+                        heapq.heappush(frontier, (new_cost, neighbor))
+            for other, target in zip(nodes[k + 1:], node_ids[k + 1:]):
+                if dist[target] < inf:
+                    edges[node].append((other, dist[target]))
+                    edges[other].append((node, dist[target] - enter[other] + enter[node]))
+        return edges
+
+    def local_path(self, start, goal):
+        """تفصيل مقطع واحد داخل مجموعة البداية"""
+        _, came_from = self.local_search(start, self.cluster_bounds(self.cluster_of(start)),
+                                         goal=goal)
+        if goal not in came_from:
+            return None
+        path = [goal]
+        while path[-1] != start:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path
+
+    def find_path(self, start, goal, arrays):
+        """
+        مسار كامل بين خليتين (أرقام خلايا) أو None إذا لم يوجد
+        arrays: مصفوفات بحث مسطحة (SearchArrays) يستخدمها التفصيل
+        Returns:
+            list - أرقام الخلايا من البداية إلى النهاية
+        """
+        steps = self.path_steps(start, goal, arrays)
+        try:
+            while True:
+                next(steps)
+        except StopIteration as finished:
+            return finished.value
+
+    def path_steps(self, start, goal, arrays, slice_size=0):
+        """
+        find_path قابل للإيقاف (مولد): يتوقف بعد كل slice_size عقدة موسعة في
+        البحث المجرد أو في التفصيل (0 = بدون توقف) ويعيد المسار عند الانتهاء.
+        ربط البداية والنهاية بعقد مجموعتيهما محصور في مجموعة واحدة فلا يتوقف
+        """
+        if start == goal:
+            return [start]
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+
+        # داخل نفس المجموعة: بحث محلي مباشر
+        if start_cluster == goal_cluster:
+            path = self.local_path(start, goal)
+            if path is not None:
+                return path
+
+        # ربط البداية والنهاية مؤقتاً بعقد مجموعتيهما
+        start_nodes = self.cluster_nodes.get(start_cluster, [])
+        goal_nodes = self.cluster_nodes.get(goal_cluster, [])
+        start_dist, _ = self.local_search(start, self.cluster_bounds(start_cluster),
+                                          goals=start_nodes)
+        goal_dist, _ = self.local_search(goal, self.cluster_bounds(goal_cluster),
+                                         goals=goal_nodes, reverse=True)
+        exits = {node: goal_dist[node] for node in goal_nodes if node in goal_dist}
+        if not exits:
+            return None
+
+        # A* على الرسم المجرد
+        cols = self.cols
+        goal_x, goal_y = goal % cols, goal // cols
+        diagonal_factor = math.sqrt(2) - 2
+
+        def heuristic(cell):
+            dx, dy = abs(cell % cols - goal_x), abs(cell // cols - goal_y)
+            return (dx + dy) + diagonal_factor * min(dx, dy)
+
+        g_score = {start: 0.0}
+        came_from = {}
+        frontier = [(heuristic(start), start)]
+        closed = set()
+        expanded = 0
+        pause_at = slice_size or -1
+        while frontier:
+            if expanded == pause_at:
+                pause_at += slice_size
+                yield  # متابعة في الإطار التالي
+            _, current = heapq.heappop(frontier)
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded += 1
+            if current == goal:
+                break
+
+            neighbors = list(self.inter_edges.get(current, ()))
+            neighbors += self.intra_edges.get(self.cluster_of(current), {}).get(current, [])
+            if current == start:
+                neighbors += [(node, start_dist[node]) for node in start_nodes
+                              if node in start_dist]
+            if current in exits:
+                neighbors.append((goal, exits[current]))
+
+            for neighbor, cost in neighbors:
+                tentative = g_score[current] + cost
+                if tentative < g_score.get(neighbor, math.inf):
+                    g_score[neighbor] = tentative
+                    came_from[neighbor] = current
+                    heapq.heappush(frontier, (tentative + heuristic(neighbor), neighbor))
+
+        if goal not in came_from:
+            return None
+
+        # تفصيل: A* واحد من البداية إلى النهاية داخل ممر المجموعات التي يمر بها
+        # المسار المجرد (مع حلقة مجاورة). الممر يحتوي مسار HPA المفصّل مقطعاً
+        # مقطعاً، فالنتيجة لا تسوء عنه أبداً وتزيل تعرجات المرور بخلايا المداخل.
+        # يعمل على مصفوفات البحث المسطحة بأختام الأجيال مثل AStar.search_steps
+        clusters_x, size = self.clusters_x, self.cluster_size
+        corridor = bytearray(clusters_x * self.clusters_y)
+        node = goal
+        while True:
+            cluster = self.cluster_of(node)
+            cx, cy = cluster % clusters_x, cluster // clusters_x
+            for ny in range(max(cy - 1, 0), min(cy + 2, self.clusters_y)):
+                for nx in range(max(cx - 1, 0), min(cx + 2, clusters_x)):
+                    corridor[ny * clusters_x + nx] = 1
+            if node == start:
+                break
+            node = came_from[node]
+
+        offsets, targets, costs = self.graph.offsets, self.graph.targets, self.graph.costs
+        # قيم الخلية صالحة فقط إذا كان ختمها mark (نفس ترقيم أختام AStar.search_steps)
+        mark = arrays.next_generation() * 2
+        g_score, came_from, state = arrays.g_score, arrays.came_from, arrays.state
+        g_score[start] = 0.0
+        came_from[start] = -1
+        state[start] = mark
+        frontier = [(0.0, 0.0, start)]
+        while frontier:
+            if expanded == pause_at:
+                pause_at += slice_size
+                yield
+            _, current_g, current = heapq.heappop(frontier)
+            if current_g > g_score[current]:
+                continue  # عنصر قديم في الطابور
+            expanded += 1
+            if current == goal:
+                break
+
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[i]
+                nx, ny = neighbor % cols, neighbor // cols
+                if not corridor[(ny // size) * clusters_x + nx // size]:
+                    continue
+                tentative = current_g + costs[i]
+                if state[neighbor] == mark and tentative >= g_score[neighbor]:
+                    continue
+                state[neighbor] = mark
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative
+                dx, dy = abs(nx - goal_x), abs(ny - goal_y)
+                f = tentative + (dx + dy) + diagonal_factor * min(dx, dy)
+                heapq.heappush(frontier, (f, tentative, neighbor))
+
+        path = [goal]
+        while path[-1] != start:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path
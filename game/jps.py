@@ -0,0 +1,257 @@
+import heapq
+import math
+from array import array
+import numpy as np
+from .navigation import NavGraph
+
+
+def ray_distances(walkable):
+    """
+    جدول القفز المستقيم نحو +x لكل خلية (مثل JPS+):
+    موجب = عدد الخطوات إلى أول نقطة قفز، وغير ذلك = -(عدد الخطوات المفتوحة قبل الجدار)
+    """
+    rows, cols = walkable.shape
+    blocked = np.ones((rows + 2, cols + 2), dtype=np.bool_)
+    blocked[1:-1, 1:-1] = ~walkable
+
+    # جار إجباري: خلية مفتوحة فوق/تحت الخلية بينما المقابلة لها خلفها جدار
+    above, below = ~blocked[:-2, 1:-1], ~blocked[2:, 1:-1]
+    behind_above, behind_below = blocked[:-2, :-2], blocked[2:, :-2]
+    forced = walkable & ((above & behind_above) | (below & behind_below))
+
+    index = np.arange(cols)
+    never = 2 * cols
+
+    def next_index(at):
+        """أول موقع بعد كل خلية (بشكل صارم) تكون فيه at صحيحة"""
+        positions = np.full((rows, cols), never)
+        positions[:, :-1] = np.where(at[:, 1:], index[1:], never)
+        return np.minimum.accumulate(positions[:, ::-1], axis=1)[:, ::-1]
+
+    next_forced = next_index(forced)
+    next_wall = np.minimum(next_index(~walkable), cols)
+    return np.where(next_forced < next_wall, next_forced - index, index + 1 - next_wall)
+
+
+class JumpPointSearch:
+    """
+    بحث نقاط القفز (JPS) على رسم التنقل
+    بدلاً من إضافة كل جار إلى الطابور، يقفز البحث في خط مستقيم حتى يصل إلى
+    خلية لها جار "إجباري" (بجانب زاوية جدار) أو إلى الهدف، فتُتجاهل المسارات
+    المتماثلة في المناطق المفتوحة
+    القفزات المستقيمة محسوبة مسبقاً لكل خلية واتجاه، وتكلفة كل قفزة هي مجموع
+    تكاليف دخول الخلايا التي تمر بها (بما فيها عقوبة الجدران)
+    يتبع نفس قاعدة عدم قطع زوايا الجدران في الحركة القطرية
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.cols = cols = graph.cols
+        self.rows = rows = graph.rows
+        self.moves = graph.moves
+        self.penalty = graph.enter_costs
+        self.bits = {step: 1 << i for i, step in enumerate(graph.steps)}
+        self.diagonal = len(graph.steps) > 4
+
+        walkable = np.frombuffer(graph.enterable, dtype=np.uint8).reshape(rows, cols) > 0
+        flipped = walkable[:, ::-1]
+        transposed = walkable.T
+        self.rays = {
+            (1, 0): ray_distances(walkable),
+            (-1, 0): ray_distances(flipped)[:, ::-1],
+            (0, 1): ray_distances(transposed).T,
+            (0, -1): ray_distances(transposed[:, ::-1])[:, ::-1].T,
+        }
+        self.rays = {step: array('i', table.astype(np.int32).tobytes())
+                     for step, table in self.rays.items()}
+
+        # مجاميع تراكمية لتكاليف الدخول على كل صف وعمود لحساب تكلفة القفزة فوراً
+        penalty = np.frombuffer(graph.enter_costs, dtype=np.float64).reshape(rows, cols)
+        row_sums = np.zeros((rows, cols + 1))
+        np.cumsum(penalty, axis=1, out=row_sums[:, 1:])
+        column_sums = np.zeros((cols, rows + 1))
+        np.cumsum(penalty.T, axis=1, out=column_sums[:, 1:])
+        self.row_sums = array('d', row_sums.tobytes())
+        self.column_sums = array('d', column_sums.tobytes())
+
+    @classmethod
+    def for_world(cls, world):
+        """الباحث المخزن للعالم (يعاد بناؤه مع رسم التنقل)"""
+        graph = NavGraph.for_world(world)
+        return world.get_derived(('jps', id(graph)), lambda: cls(graph))
+
+    @property
+    def memory_bytes(self):
+        """حجم الجداول المحسوبة مسبقاً بالبايت"""
+        arrays = list(self.rays.values()) + [self.row_sums, self.column_sums]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+    def straight_cost(self, x, y, dx, dy, steps):
+        """مجموع تكاليف دخول الخلايا في قفزة مستقيمة"""
+        if dx:
+            base = y * (self.cols + 1)
+            if dx > 0:
+                return self.row_sums[base + x + steps + 1] - self.row_sums[base + x + 1]
+            return self.row_sums[base + x] - self.row_sums[base + x - steps]
+        base = x * (self.rows + 1)
+        if dy > 0:
+            return self.column_sums[base + y + steps + 1] - self.column_sums[base + y + 1]
+        return self.column_sums[base + y] - self.column_sums[base + y - steps]
+
+    def straight(self, x, y, dx, dy, goal_x, goal_y):
+        """
+        عدد خطوات القفزة المستقيمة من (x, y) أو 0 إذا لم توجد نقطة قفز
+        الهدف على نفس الخط قبل نقطة القفز (أو قبل الجدار) يوقف القفزة عنده
+        """
+        distance = self.rays[(dx, dy)][y * self.cols + x]
+        if dx:
+            to_goal = (goal_x - x) * dx if goal_y == y else 0
+        else:
+            to_goal = (goal_y - y) * dy if goal_x == x else 0
+        if 0 < to_goal <= abs(distance):
+            return to_goal
+        return distance if distance > 0 else 0
+
+    def jump(self, x, y, dx, dy, goal):
+        """
+        القفز من الخلية (x, y) في الاتجاه (dx, dy)
+        Returns:
+            (رقم نقطة القفز، تكلفة الوصول إليها) أو None إذا انسد الطريق
+        """
+        cols = self.cols
+        goal_x, goal_y = goal % cols, goal // cols
+
+        if not (dx and dy) and (dx or self.diagonal):
+            steps = self.straight(x, y, dx, dy, goal_x, goal_y)
+            if not steps:
+                return None
+            cell = (y + dy * steps) * cols + x + dx * steps
+            return cell, self.straight_cost(x, y, dx, dy, steps)
+
+        # القطري (أو العمودي بدون حركة قطرية) يتقدم خطوة خطوة ويمسح الاتجاهين
+        # المستقيمين من كل خلية؛ أول مسح ينجح يجعل الخلية نقطة قفز
+        moves, penalty = self.moves, self.penalty
+        straight = self.straight
+        bit = self.bits[(dx, dy)]
+        if dx:
+            scans = ((dx, 0), (0, dy))
+        else:
+            scans = ((1, 0), (-1, 0))
+            vertical = self.rays[(0, dy)][y * cols + x]
+        cell = y * cols + x
+        cost = 0.0
+        taken = 0
+        while moves[cell] & bit:
+            x += dx
+            y += dy
+            cell = y * cols + x
+            cost += penalty[cell]
+            if cell == goal:
+                return cell, cost
+            if (straight(x, y, scans[0][0], scans[0][1], goal_x, goal_y) or
+                    straight(x, y, scans[1][0], scans[1][1], goal_x, goal_y)):
+                return cell, cost
+            if not dx:
+                taken += 1
+                if taken == vertical:
+                    return cell, cost  # نقطة قفز عمودية محسوبة مسبقاً
+        return None
+
+    def directions(self, cell, parent):
+        """الاتجاهات التي تستحق الاستكشاف بعد الوصول إلى cell من parent"""
+        if parent is None:
+            return self.graph.steps
+        cols = self.cols
+        dx = (cell % cols > parent % cols) - (cell % cols < parent % cols)
+        dy = (cell // cols > parent // cols) - (cell // cols < parent // cols)
+        if dx and dy:
+            return ((0, dy), (dx, 0), (dx, dy))
+        if dx:
+            straight = ((dx, 0), (0, 1), (0, -1))
+            return straight + ((dx, 1), (dx, -1)) if self.diagonal else straight
+        straight = ((0, dy), (1, 0), (-1, 0))
+        return straight + ((1, dy), (-1, dy)) if self.diagonal else straight
+
+    def find_path(self, start, goal, max_expansions):
+        """
+        البحث بين خليتين (أرقام خلايا)
+        Returns:
+            (قائمة أرقام الخلايا، عدد نقاط القفز الموسعة)
+            عند الفشل أو تجاوز max_expansions يعاد أفضل مسار جزئي مثل A*
+        """
+        steps = self.path_steps(start, goal, max_expansions)
+        try:
+            while True:
+                next(steps)
+        except StopIteration as finished:
+            return finished.value
+
+    def path_steps(self, start, goal, max_expansions, slice_size=0):
+        """
+        find_path قابل للإيقاف (مولد): يتوقف بعد كل slice_size قفزة
+        (0 = بدون توقف). القفزة وحدة العمل هنا وليست نقطة القفز الموسعة، لأن
+        كل توسيع يقفز حتى ثمانية اتجاهات
+        """
+        cols = self.cols
+        goal_x, goal_y = goal % cols, goal // cols
+        diagonal_factor = math.sqrt(2) - 2
+
+        open_set = [(0.0, start)]
+        g_score = {start: 0.0}
+        came_from = {}
+        closed = set()
+        current = start
+        expanded = 0
+        jumps = 0
+        pause_at = slice_size or -1
+        while open_set and expanded < max_expansions:
+            current = heapq.heappop(open_set)[1]
+            if current in closed:
+                continue
+            closed.add(current)
+            expanded += 1
+            if current == goal:
+                break
+
+            x, y = current % cols, current // cols
+            current_g = g_score[current]
+            for dx, dy in self.directions(current, came_from.get(current)):
+                if jumps >= pause_at > 0:
+                    pause_at += slice_size
+                    yield  # متابعة في الإطار التالي
+                jumps += 1
+                found = self.jump(x, y, dx, dy, goal)
+                if found is None:
+                    continue
+                point, cost = found
+                tentative_g = current_g + cost
+                if point not in closed and tentative_g < g_score.get(point, math.inf):
+                    g_score[point] = tentative_g
+                    came_from[point] = current
+                    hx = abs(point % cols - goal_x)
+                    hy = abs(point // cols - goal_y)
+                    f = tentative_g + (hx + hy) + diagonal_factor * min(hx, hy)
+                    heapq.heappush(open_set, (f, point))
+
+        if not came_from:
+            return [], expanded
+        return self.expand(came_from, current), expanded
+
+    def expand(self, came_from, point):
+        """تحويل سلسلة نقاط القفز إلى كل الخلايا بينها"""
+        cols = self.cols
+        points = [point]
+        while points[-1] in came_from:
+            points.append(came_from[points[-1]])
+        points.reverse()
+
+        cells = [points[0]]
+        for a, b in zip(points, points[1:]):
+            ax, ay, bx, by = a % cols, a // cols, b % cols, b // cols
+            dx = (bx > ax) - (bx < ax)
+            dy = (by > ay) - (by < ay)
+            for _ in range(max(abs(bx - ax), abs(by - ay))):
+                ax += dx
+                ay += dy
+                cells.append(ay * cols + ax)
+        return cells
@@ -0,0 +1,147 @@
+import struct
+import numpy as np
+
+# صيغة ملف المستوى:
+#   ترويسة ثابتة ثم الخلايا مقسمة إلى قطع مربعة (chunk_size × chunk_size)
+#   مرتبة صفاً بصف، وكل قطعة مخزنة صفاً بصف (بايت لكل خلية)
+#   الخلايا الزائدة في قطع الحواف تُملأ بجدران
+LEVEL_MAGIC = b'SGLV'
+LEVEL_VERSION = 1
+LEVEL_HEADER = struct.Struct('<4sHHIIiiii')
+DEFAULT_CHUNK_SIZE = 32
+
+
+def save_level(path, grid, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    حفظ شبكة المستوى في ملف ثنائي مقسم إلى قطع
+    Args:
+        path: مسار الملف
+        grid: قائمة صفوف أو مصفوفة NumPy (1 = جدار، 0 = أرضية، 2 = بداية، 3 = نهاية)
+        chunk_size: طول ضلع القطعة بالخلايا
+    """
+    tiles = np.asarray(grid, dtype=np.uint8)
+    height, width = tiles.shape
+    chunks_y = -(-height // chunk_size)
+    chunks_x = -(-width // chunk_size)
+
+    padded = np.ones((chunks_y * chunk_size, chunks_x * chunk_size), dtype=np.uint8)
+    padded[:height, :width] = tiles
+    chunks = padded.reshape(chunks_y, chunk_size, chunks_x, chunk_size).transpose(0, 2, 1, 3)
+
+    start = _first_cell(tiles, 2)
+    end = _first_cell(tiles, 3)
+    with open(path, 'wb') as f:
+        f.write(LEVEL_HEADER.pack(
+            LEVEL_MAGIC, LEVEL_VERSION, chunk_size, width, height,
+            start[0], start[1], end[0], end[1]
+        ))
+        f.write(np.ascontiguousarray(chunks).tobytes())
+
+
+def load_level(path):
+    """تحميل مستوى من ملف ثنائي بدون قراءته بالكامل إلى الذاكرة"""
+    return TileMap(path)
+
+
+def _first_cell(tiles, value):
+    """أول خلية (x, y) بقيمة معينة بترتيب الصفوف، أو (-1, -1)"""
+    found = np.flatnonzero(tiles == value)
+    if not len(found):
+        return (-1, -1)
+    y, x = divmod(int(found[0]), tiles.shape[1])
+    return (x, y)
+
+
+class TileMap:
+    """
+    شبكة مستوى مربوطة بالملف عبر memory mapping
+    نظام التشغيل يحمّل القطع فقط عند الوصول إليها، ويدعم grid[y][x] و len(grid)
+    مثل قائمة الصفوف العادية. التعديلات تبقى في الذاكرة ولا تُكتب في الملف
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(LEVEL_HEADER.size)
+        if len(header) < LEVEL_HEADER.size:
+            raise ValueError(f"ملف مستوى غير صالح: {path}")
+
+        (magic, version, self.chunk_size, self.width, self.height,
+         start_x, start_y, end_x, end_y) = LEVEL_HEADER.unpack(header)
+        if magic != LEVEL_MAGIC or version != LEVEL_VERSION:
+            raise ValueError(f"ملف مستوى غير صالح: {path}")
+
+        self.path = path
+        self.chunks_y = -(-self.height // self.chunk_size)
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks = np.memmap(
+            path, dtype=np.uint8, mode='c', offset=LEVEL_HEADER.size,
+            shape=(self.chunks_y, self.chunks_x, self.chunk_size, self.chunk_size)
+        )
+
+        # مواقع البداية والنهاية محفوظة في الترويسة لتجنب مسح الخريطة
+        self.markers = {}
+        if start_x >= 0:
+            self.markers[2] = (start_x, start_y)
+        if end_x >= 0:
+            self.markers[3] = (end_x, end_y)
+
+    def __len__(self):
+        return self.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.height:
+            raise IndexError(y)
+        return TileRow(self, y)
+
+    def __array__(self, dtype=None, copy=None):
+        tiles = self.region(0, 0, self.width, self.height)
+        return tiles if dtype is None else tiles.astype(dtype, copy=False)
+
+    def chunk(self, chunk_x, chunk_y):
+        """قطعة واحدة كعرض بدون نسخ (تُحمّل من القرص عند أول وصول)"""
+        return self.chunks[chunk_y, chunk_x]
+
+    def region(self, x0, y0, x1, y1):
+        """
+        نسخ مستطيل من الخلايا [x0, x1) × [y0, y1) بترتيب الصفوف
+        يلمس فقط القطع التي يغطيها المستطيل
+        """
+        cs = self.chunk_size
+        cx0, cy0 = x0 // cs, y0 // cs
+        cx1, cy1 = -(-x1 // cs), -(-y1 // cs)
+        block = self.chunks[cy0:cy1, cx0:cx1].transpose(0, 2, 1, 3)
+        block = block.reshape((cy1 - cy0) * cs, (cx1 - cx0) * cs)
+        return np.array(block[y0 - cy0 * cs:y1 - cy0 * cs, x0 - cx0 * cs:x1 - cx0 * cs])
+
+    def get(self, x, y):
+        cs = self.chunk_size
+        return int(self.chunks[y // cs, x // cs, y % cs, x % cs])
+
+    def set(self, x, y, tile):
+        cs = self.chunk_size
+        self.chunks[y // cs, x // cs, y % cs, x % cs] = tile
+        if tile in self.markers or (x, y) in self.markers.values():
+            self.markers.clear()  # الترويسة لم تعد صحيحة
+
+
+class TileRow:
+    """صف واحد من TileMap يدعم row[x] للقراءة والكتابة"""
+
+    __slots__ = ('tiles', 'y')
+
+    def __init__(self, tiles, y):
+        self.tiles = tiles
+        self.y = y
+
+    def __len__(self):
+        return self.tiles.width
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.tiles.width:
+            raise IndexError(x)
+        return self.tiles.get(x, self.y)
+
+    def __setitem__(self, x, tile):
+        if not 0 <= x < self.tiles.width:
+            raise IndexError(x)
+        self.tiles.set(x, self.y, tile)
@@ -0,0 +1,107 @@
+from array import array
+import numpy as np
+from settings import *
+
+# اتجاهات الجوار بنفس ترتيب World.get_neighbors: الأساسية ثم القطرية
+STRAIGHT_STEPS = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+DIAGONAL_STEPS = [(1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+
+class NavGraph:
+    """
+    رسم التنقل المضغوط (CSR) للشبكة
+    كل خلية لها رقم صحيح id = y * cols + x، وجيرانها في
+    targets[offsets[id]:offsets[id + 1]] مع تكلفة الحافة في costs
+    التكلفة تشمل عقوبة الجدران المجاورة من AStar.calculate_cost
+    """
+
+    def __init__(self, world, clearance, allow_diagonal, wall_avoidance):
+        self.cols = world.cols
+        self.rows = world.rows
+        self.cell_size = world.cell_size
+        rows, cols = self.rows, self.cols
+
+        walls = world.walls
+        floor = ~walls
+
+        # الخلايا التي يمكن الدخول إليها (أرضية ويتسع مركزها لكائن بحجم اللاعب)
+        centers_x = np.arange(cols) * self.cell_size + self.cell_size // 2
+        centers_y = np.arange(rows) * self.cell_size + self.cell_size // 2
+        if clearance < self.cell_size / 2:
+            enterable = floor
+        else:
+            grid_x, grid_y = np.meshgrid(centers_x, centers_y)
+            enterable = floor & world.are_valid_positions(
+                grid_x.ravel(), grid_y.ravel(), clearance
+            ).reshape(rows, cols)
+
+        # عقوبة الجدران: عدد الجدران الأربعة المجاورة من حقل المسافة × wall_avoidance
+        adjacent_walls = world.get_clearance().adjacent_walls
+        self.penalty = 1.0 + adjacent_walls * wall_avoidance
+
+        def shifted(mask, dx, dy, fill=False):
+            """mask[y + dy, x + dx] لكل خلية (x, y)"""
+            out = np.full((rows, cols), fill, dtype=mask.dtype)
+            ys = slice(max(0, -dy), rows - max(0, dy))
+            xs = slice(max(0, -dx), cols - max(0, dx))
+            src_y = slice(max(0, dy), rows - max(0, -dy))
+            src_x = slice(max(0, dx), cols - max(0, -dx))
+            out[ys, xs] = mask[src_y, src_x]
+            return out
+
+        steps = list(STRAIGHT_STEPS)
+        edges = [shifted(enterable, dx, dy) for dx, dy in STRAIGHT_STEPS]
+        if allow_diagonal:
+            for dx, dy in DIAGONAL_STEPS:
+                # ممنوع قطع زوايا الجدران
+                edges.append(shifted(enterable, dx, dy) &
+                             shifted(floor, dx, 0) & shifted(floor, 0, dy))
+                steps.append((dx, dy))
+
+        ids = np.arange(rows * cols).reshape(rows, cols)
+        edge_mask = np.stack(edges, axis=-1)  # (rows, cols, directions)
+        self.steps = steps
+
+        # نفس المعلومات كأقنعة لبحث القفز: خلايا يمكن دخولها، وبت لكل اتجاه مسموح
+        self.enterable = bytes(enterable.ravel().astype(np.uint8))
+        bits = (1 << np.arange(len(steps))).astype(np.uint8)
+        self.moves = bytes((edge_mask * bits).sum(axis=-1, dtype=np.uint8).ravel())
+        step_offsets = np.array([dy * cols + dx for dx, dy in steps])
+        targets = (ids[..., None] + step_offsets)[edge_mask]
+        counts = edge_mask.sum(axis=-1).ravel()
+
+        offsets = np.zeros(rows * cols + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        self.offsets = array('q', offsets.tobytes())
+        self.targets = array('q', targets.astype(np.int64).tobytes())
+        self.costs = array('d', self.penalty.ravel()[targets].astype(np.float64).tobytes())
+        self.enter_costs = array('d', self.penalty.ravel().astype(np.float64).tobytes())
+
+    @classmethod
+    def for_world(cls, world):
+        """رسم التنقل المخزن للعالم (يعاد بناؤه فقط عند تغير الشبكة أو الإعدادات)"""
+        settings = AI_SETTINGS['pathfinding']
+        clearance = PLAYER_SETTINGS['size'] + 2
+        allow_diagonal = settings.get('allow_diagonal', True)
+        wall_avoidance = settings['wall_avoidance']
+        return world.get_derived(
+            ('nav_graph', clearance, allow_diagonal, wall_avoidance),
+            lambda: cls(world, clearance, allow_diagonal, wall_avoidance)
+        )
+
+    @property
+    def memory_bytes(self):
+        """حجم المصفوفات المسطحة بالبايت"""
+        arrays = (self.offsets, self.targets, self.costs, self.enter_costs)
+        return (sum(a.itemsize * len(a) for a in arrays) +
+                len(self.enterable) + len(self.moves))
+
+    def cell_id(self, cell):
+        return cell[1] * self.cols + cell[0]
+
+    def cell(self, cell_id):
+        return (cell_id % self.cols, cell_id // self.cols)
+
+    def neighbors(self, cell_id):
+        """أرقام الخلايا المجاورة التي يمكن الدخول إليها"""
+        return self.targets[self.offsets[cell_id]:self.offsets[cell_id + 1]]
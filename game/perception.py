@@ -0,0 +1,187 @@
+import heapq
+import math
+import time
+from array import array
+import numpy as np
+from settings import *
+
+# مراحل الرؤية بالترتيب؛ كل مرحلة تستبعد جزءاً من الحراس الباقين من المرحلة السابقة
+VISION_STAGES = ('guards', 'nearby', 'range', 'cone', 'sight')
+
+
+class VisionCuller:
+    """
+    رؤية اللاعب لكل الحراس دفعة واحدة
+    المسافة ومخروط النظر يُحسبان بشكل متجه على كل المرشحين، ثم يُتتبع خط
+    الرؤية (أغلى فحص) للقلة الباقية فقط. يحتفظ بعدد الحراس الباقين بعد كل
+    مرحلة وزمن الجزء المتجه وزمن الأشعة، للإطار الأخير ومجموعاً منذ البداية
+    """
+
+    def __init__(self):
+        self.last = dict.fromkeys(VISION_STAGES, 0)
+        self.totals = dict.fromkeys(VISION_STAGES, 0)
+        self.frames = 0
+        self.cull_ms = 0.0
+        self.ray_ms = 0.0
+
+    def see(self, x, y, direction, alert, target, world, total=None):
+        """
+        Args:
+            x, y, direction, alert: مصفوفات المرشحين (الحراس القريبون من اللاعب)
+            target: موقع اللاعب (x, y)
+            total: عدد كل الحراس قبل استبعاد البعيدين (للإحصاء فقط)
+        Returns:
+            (seen, dist): مصفوفة منطقية بطول المرشحين ومسافاتهم إلى اللاعب
+        """
+        began = time.perf_counter()
+        vision = GUARD_SETTINGS['vision']
+        dx = target[0] - x
+        dy = target[1] - y
+        dist = np.hypot(dx, dy)
+
+        # المسافة أولاً ثم الزاوية، فلا تُحسب الزاوية إلا لمن هم ضمن المدى
+        in_range = np.flatnonzero(dist <= vision['distance'] * (1 + alert * 0.5))
+        range_alert = alert[in_range]
+        player_angle = np.degrees(np.arctan2(dy[in_range], dx[in_range]))
+        angle_diff = np.abs(np.mod(player_angle - direction[in_range] + 180, 360) - 180)
+        in_cone = in_range[angle_diff <= vision['angle'] / (2 - range_alert)]
+        culled = time.perf_counter()
+
+        seen = np.zeros(len(x), dtype=np.bool_)
+        for i in in_cone.tolist():
+            seen[i] = world.has_line_of_sight((x[i], y[i]), target)
+        self.ray_ms += (time.perf_counter() - culled) * 1000
+        self.cull_ms += (culled - began) * 1000
+
+        counts = self.last
+        counts['guards'] = len(x) if total is None else total
+        counts['nearby'] = len(x)
+        counts['range'] = len(in_range)
+        counts['cone'] = len(in_cone)
+        counts['sight'] = int(np.count_nonzero(seen))
+        for stage in VISION_STAGES:
+            self.totals[stage] += counts[stage]
+        self.frames += 1
+        return seen, dist
+
+    def culled(self, counts=None):
+        """عدد الحراس المستبعدين عند كل مرحلة (من المجموع افتراضياً)"""
+        counts = self.totals if counts is None else counts
+        return {stage: counts[previous] - counts[stage]
+                for previous, stage in zip(VISION_STAGES, VISION_STAGES[1:])}
+
+    def reset(self):
+        self.__init__()
+
+
+def noise_range(player):
+    """مدى صوت خطوات اللاعب حسب طريقة مشيه (0 إذا كان صامتاً تقريباً)"""
+    if player.noise_level <= 0.5:
+        return 0
+    hearing = GUARD_SETTINGS['hearing']
+    return hearing['sprint_range'] if player.is_sprinting else \
+        hearing['normal_range'] if not player.is_sneaking else \
+        hearing['sneak_range']
+
+
+class NoiseField:
+    """
+    مسافة انتشار صوت اللاعب لكل خلية، محسوبة مرة واحدة لكل إطار
+    Dijkstra محدود من خلية اللاعب بثمانية اتجاهات: كل خطوة تكلف طولها بالبكسل،
+    والعبور داخل جدار يضاعفها بـ wall_attenuation. الحارس يسمع إذا كانت مسافة
+    موقعه أقل من مدى الصوت (مضروباً في تنبهه)، بقراءة واحدة مهما كان عدد الحراس.
+    مسافة موقع = تكلفة خليته + الخط المستقيم منه إلى مركزها، وفي خلية المصدر
+    نفسها الخط المستقيم إلى المصدر. يعاد الحساب فقط عند انتقال اللاعب إلى خلية
+    أخرى أو تغير مدى الصوت
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.cols = world.cols
+        count = world.cols * world.rows
+        self.cost = array('d', [math.inf]) * count
+        self.costs = np.frombuffer(self.cost, dtype=np.float64)  # نفس الذاكرة للقراءة المتجهة
+        self.touched = []
+        self.source = None
+        self.origin = (0.0, 0.0)
+        self.range = 0
+        self.updates = 0
+
+    @classmethod
+    def for_world(cls, world):
+        """الحقل المشترك للعالم (يعاد إنشاؤه عند تغير الشبكة)"""
+        return world.get_derived('noise_field', lambda: cls(world))
+
+    def update(self, source, noise_range):
+        """
+        Args:
+            source: موقع مصدر الصوت بالبكسل
+            noise_range: مدى الصوت بالبكسل (0 = صامت)
+        """
+        cell = self.world.cell_id(source) if noise_range else None
+        self.origin = source  # داخل نفس الخلية يتغير الموقع فقط وليس الحقل
+        if cell == self.source and noise_range == self.range:
+            return
+        self.source = cell
+        self.range = noise_range
+        self.updates += 1
+
+        cost = self.cost
+        for touched in self.touched:
+            cost[touched] = math.inf
+        self.touched = touched = []
+        if cell is None:
+            return
+
+        world = self.world
+        cols, rows = world.cols, world.rows
+        occupancy = world.occupancy
+        cs = world.cell_size
+        wall = SOUND_SETTINGS['propagation']['wall_attenuation']
+        steps = [(dx, dy, cs * math.hypot(dx, dy))
+                 for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+        max_cost = noise_range * 2  # أقصى مدى عند تنبه كامل
+
+        cost[cell] = 0.0
+        touched.append(cell)
+        frontier = [(0.0, cell)]
+        while frontier:
+            current_cost, current = heapq.heappop(frontier)
+            if current_cost > cost[current]:
+                continue
+            x, y = current % cols, current // cols
+            for dx, dy, length in steps:
+                nx, ny = x + dx, y + dy
+                if not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                neighbor = ny * cols + nx
+                step_cost = current_cost + (length * wall if occupancy[neighbor] else length)
+                if step_cost < cost[neighbor] and step_cost < max_cost:
+                    if cost[neighbor] == math.inf:
+                        touched.append(neighbor)
+                    cost[neighbor] = step_cost
+                    heapq.heappush(frontier, (step_cost, neighbor))
+
+    def distance_at(self, position):
+        """مسافة الصوت إلى موقع بالبكسل (inf خارج مداه أو خارج الخريطة)"""
+        cell = self.world.cell_id(position)
+        if cell is None:
+            return math.inf
+        x, y = position
+        if cell == self.source:
+            return math.hypot(x - self.origin[0], y - self.origin[1])
+        cs = self.world.cell_size
+        return self.cost[cell] + math.hypot(x - (x // cs + 0.5) * cs, y - (y // cs + 0.5) * cs)
+
+    def distances(self, x, y):
+        """نفس distance_at لمصفوفات مواقع"""
+        cs = self.world.cell_size
+        grid_x = np.floor_divide(x, cs)
+        grid_y = np.floor_divide(y, cs)
+        inside = (grid_x >= 0) & (grid_x < self.cols) & (grid_y >= 0) & (grid_y < self.world.rows)
+        cells = np.where(inside, grid_y * self.cols + grid_x, 0).astype(np.intp)
+        dist = self.costs[cells] + np.hypot(x - (grid_x + 0.5) * cs, y - (grid_y + 0.5) * cs)
+        here = inside & (cells == self.source)
+        dist[here] = np.hypot(x[here] - self.origin[0], y[here] - self.origin[1])
+        dist[~inside] = math.inf
+        return dist
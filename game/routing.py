@@ -0,0 +1,181 @@
+import hashlib
+import heapq
+import math
+import os
+import struct
+import time
+from array import array
+import numpy as np
+from settings import *
+from .navigation import NavGraph
+
+# صيغة ملف الجدول: ترويسة ثم أرقام الخلايا المفتوحة (int32) ثم الجدول (بايت لكل زوج)
+# الترويسة تحمل بصمة تكاليف الرسم، فأي تغير في عقوبات الجدران يعيد الخبز
+TABLE_MAGIC = b'SGNH'
+TABLE_VERSION = 2
+TABLE_HEADER = struct.Struct('<4sHIIIdB16s')
+NO_HOP = 255  # لا يوجد طريق (أو المصدر هو الوجهة)
+
+
+class NextHopTable:
+    """
+    جدول الخطوة التالية لكل زوج (مصدر، وجهة) من الخلايا المفتوحة
+    القيمة رقم الاتجاه في graph.steps نحو الخلية التالية على أرخص طريق،
+    بنفس تكاليف دخول الخلايا في رسم التنقل، فيُبنى أي مسار بقراءات متتالية
+    من صف الوجهة بدون أي بحث. الحجم count² بايت، لذلك هو للخرائط الصغيرة
+    والمتوسطة فقط. bake_ms زمن الخبز (0 للجدول المقروء من ملف) و memory_bytes
+    حجمه؛ benchmarks.pathfinding يعرضهما
+    """
+
+    def __init__(self, graph, cells, hops, bake_ms=0.0):
+        self.graph = graph
+        self.cols = graph.cols
+        self.cells = cells
+        self.hops = hops
+        self.bake_ms = bake_ms
+        self.index = array('i', [-1]) * (graph.cols * graph.rows)
+        for i, cell in enumerate(cells):
+            self.index[cell] = i
+        self.step_offsets = [dy * graph.cols + dx for dx, dy in graph.steps]
+
+    @classmethod
+    def for_world(cls, world):
+        """
+        الجدول المخزن للعالم، أو None إذا تجاوزت الخلايا المفتوحة next_hop_max_cells
+        إذا حُدد next_hop_file يُقرأ الجدول منه (memory mapping) ويُعاد خبزه إذا لم يطابق
+        """
+        graph = NavGraph.for_world(world)
+        settings = AI_SETTINGS['pathfinding']
+        return world.get_derived(
+            ('next_hop', id(graph), settings['next_hop_max_cells'], settings['next_hop_file']),
+            lambda: cls.prepare(graph, settings['next_hop_max_cells'], settings['next_hop_file'])
+        )
+
+    @classmethod
+    def prepare(cls, graph, max_cells, path=None):
+        if sum(graph.enterable) > max_cells:
+            return None
+        if path and os.path.exists(path):
+            table = cls.load(path, graph)
+            if table is not None:
+                return table
+        table = cls.bake(graph)
+        if path:
+            table.save(path)
+        return table
+
+    @classmethod
+    def bake(cls, graph):
+        """
+        بناء الجدول: Dijkstra عكسي من كل وجهة
+        الحواف متماثلة بين الخلايا المفتوحة، والانتقال v -> u يكلف دخول u
+        """
+        started = time.perf_counter()
+        cells = np.flatnonzero(np.frombuffer(graph.enterable, dtype=np.uint8)).astype(np.int32)
+        count = len(cells)
+        index = {int(cell): i for i, cell in enumerate(cells)}
+        offsets, targets = graph.offsets, graph.targets
+        step_of = {offset: d for d, offset in
+                   enumerate(dy * graph.cols + dx for dx, dy in graph.steps)}
+
+        # الجيران بالأرقام المضغوطة مع اتجاه الخطوة من الجار إلى الخلية
+        neighbors = []
+        for cell in cells.tolist():
+            neighbors.append([(index[targets[i]], step_of[cell - targets[i]])
+                              for i in range(offsets[cell], offsets[cell + 1])])
+        enter = [graph.enter_costs[cell] for cell in cells.tolist()]
+
+        hops = np.full((count, count), NO_HOP, dtype=np.uint8)
+        inf = math.inf
+        for destination in range(count):
+            dist = [inf] * count
+            hop = bytearray([NO_HOP]) * count
+            dist[destination] = 0.0
+            frontier = [(0.0, destination)]
+            while frontier:
+                cost, current = heapq.heappop(frontier)
+                if cost > dist[current]:
+                    continue
+                cost += enter[current]
+                for neighbor, step in neighbors[current]:
+                    if cost < dist[neighbor]:
+                        dist[neighbor] = cost
+                        hop[neighbor] = step
+                        heapq.heappush(frontier, (cost, neighbor))
+            hops[destination] = np.frombuffer(hop, dtype=np.uint8)
+        return cls(graph, cells, hops, (time.perf_counter() - started) * 1000)
+
+    @staticmethod
+    def graph_digest(graph):
+        """
+        بصمة تكاليف دخول الخلايا والحركات المسموحة في الرسم
+        تشمل wall_avoidance وعدد الجدران المجاورة لكل خلية وقاعدة الزوايا القطرية
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(graph.enter_costs.tobytes())
+        digest.update(graph.moves)
+        return digest.digest()
+
+    @property
+    def memory_bytes(self):
+        """حجم الجدول وفهارسه بالبايت"""
+        return (self.hops.nbytes + self.cells.nbytes +
+                self.index.itemsize * len(self.index))
+
+    def save(self, path):
+        settings = AI_SETTINGS['pathfinding']
+        with open(path, 'wb') as f:
+            f.write(TABLE_HEADER.pack(
+                TABLE_MAGIC, TABLE_VERSION, self.graph.cols, self.graph.rows, len(self.cells),
+                settings['wall_avoidance'], settings.get('allow_diagonal', True),
+                self.graph_digest(self.graph)
+            ))
+            f.write(self.cells.astype('<i4').tobytes())
+            f.write(np.ascontiguousarray(self.hops).tobytes())
+
+    @classmethod
+    def load(cls, path, graph):
+        """قراءة جدول محفوظ عبر memory mapping، أو None إذا لا يطابق الرسم والإعدادات"""
+        with open(path, 'rb') as f:
+            header = f.read(TABLE_HEADER.size)
+        if len(header) < TABLE_HEADER.size:
+            return None
+        magic, version, cols, rows, count, wall_avoidance, allow_diagonal, digest = \
+            TABLE_HEADER.unpack(header)
+        settings = AI_SETTINGS['pathfinding']
+        if (magic != TABLE_MAGIC or version != TABLE_VERSION or
+                (cols, rows) != (graph.cols, graph.rows) or
+                wall_avoidance != settings['wall_avoidance'] or
+                bool(allow_diagonal) != settings.get('allow_diagonal', True) or
+                digest != cls.graph_digest(graph)):
+            return None
+
+        cells = np.memmap(path, dtype='<i4', mode='r', offset=TABLE_HEADER.size, shape=(count,))
+        expected = np.flatnonzero(np.frombuffer(graph.enterable, dtype=np.uint8))
+        if not np.array_equal(cells, expected):
+            return None
+        hops = np.memmap(path, dtype=np.uint8, mode='r',
+                         offset=TABLE_HEADER.size + 4 * count, shape=(count, count))
+        return cls(graph, np.asarray(cells, dtype=np.int32), hops)
+
+    def find_path(self, start, goal):
+        """
+        المسار بين خليتين (أرقام خلايا) بقراءات من الجدول
+        Returns:
+            قائمة أرقام الخلايا، أو None إذا كانت إحداهما خارج الجدول أو لا طريق بينهما
+        """
+        source = self.index[start]
+        destination = self.index[goal]
+        if source < 0 or destination < 0:
+            return None
+        row = memoryview(self.hops[destination])
+        index, step_offsets = self.index, self.step_offsets
+        path = [start]
+        cell = start
+        while cell != goal:
+            step = row[index[cell]]
+            if step == NO_HOP:
+                return None
+            cell += step_offsets[step]
+            path.append(cell)
+        return path
@@ -0,0 +1,397 @@
+import math
+import random
+import numpy as np
+
+
+class EntityHash:
+    """
+    شبكة تجزئة منتظمة للكائنات المتحركة (الحراس، النقاط المحجوزة...)
+    كل كائن في دلو خليته، ولا يتغير الدلو إلا عند عبور حد خلية، فتفحص
+    الاستعلامات الدلاء القريبة فقط ويتناسب عملها مع الكثافة المحلية
+    position: دالة اختيارية تعيد موقع الكائن الحالي (مثل صف في مصفوفات GuardEngine)؛
+    بدونها تُحفظ المواقع الممررة إلى insert/move
+    """
+
+    def __init__(self, cell_size, position=None):
+        self.cell_size = cell_size
+        self.position = position
+        self.buckets = {}
+        self.keys = {}
+        self.points = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def key(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, entity, x, y):
+        key = self.key(x, y)
+        self.keys[entity] = key
+        self.buckets.setdefault(key, []).append(entity)
+        if self.position is None:
+            self.points[entity] = (x, y)
+
+    def move(self, entity, x, y):
+        """تحديث موقع كائن (ينتقل بين الدلاء فقط عند تغير الخلية)"""
+        if self.position is None:
+            self.points[entity] = (x, y)
+        key = self.key(x, y)
+        old = self.keys[entity]
+        if key != old:
+            bucket = self.buckets[old]
+            bucket.remove(entity)
+            if not bucket:
+                del self.buckets[old]
+            self.keys[entity] = key
+            self.buckets.setdefault(key, []).append(entity)
+
+    def remove(self, entity):
+        key = self.keys.pop(entity)
+        bucket = self.buckets[key]
+        bucket.remove(entity)
+        if not bucket:
+            del self.buckets[key]
+        self.points.pop(entity, None)
+
+    def locate(self, entity):
+        if self.position is None:
+            return self.points[entity]
+        return self.position(entity)
+
+    def near(self, pos, radius):
+        """
+        الكائنات في الدلاء التي تغطي الدائرة (قد تتضمن كائنات أبعد قليلاً)
+        مناسبة عندما يطبق المستدعي شرط المسافة الدقيق بنفسه
+        """
+        cx0, cy0 = self.key(pos[0] - radius, pos[1] - radius)
+        cx1, cy1 = self.key(pos[0] + radius, pos[1] + radius)
+        buckets = self.buckets
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(buckets):
+            # الدائرة أكبر من المساحة المشغولة: المرور على الدلاء الموجودة أرخص
+            return [entity for (cx, cy), bucket in buckets.items()
+                    if cx0 <= cx <= cx1 and cy0 <= cy <= cy1 for entity in bucket]
+        found = []
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = buckets.get((cx, cy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def within(self, pos, radius):
+        """الكائنات على مسافة radius أو أقل من النقطة"""
+        limit = radius * radius
+        found = []
+        for entity in self.near(pos, radius):
+            x, y = self.locate(entity)
+            if (x - pos[0]) ** 2 + (y - pos[1]) ** 2 <= limit:
+                found.append(entity)
+        return found
+
+    def any_within(self, pos, radius):
+        limit = radius * radius
+        for entity in self.near(pos, radius):
+            x, y = self.locate(entity)
+            if (x - pos[0]) ** 2 + (y - pos[1]) ** 2 <= limit:
+                return True
+        return False
+
+    def nearest(self, pos, k=1, max_radius=math.inf):
+        """
+        أقرب k كائنات إلى النقطة بتوسيع حلقات الخلايا حول خليتها
+        Returns:
+            list - (المسافة، الكائن) مرتبة من الأقرب
+        """
+        if not self.keys:
+            return []
+        cx, cy = self.key(*pos)
+        span = self.cell_size
+        found = []
+        ring = 0
+        while True:
+            for x in range(cx - ring, cx + ring + 1):
+                for y in (range(cy - ring, cy + ring + 1) if x in (cx - ring, cx + ring)
+                          else (cy - ring, cy + ring)):
+                    for entity in self.buckets.get((x, y), ()):
+                        ex, ey = self.locate(entity)
+                        found.append((math.hypot(ex - pos[0], ey - pos[1]), entity))
+            # كل الخلايا خارج هذه الحلقة أبعد من ring * span
+            found.sort(key=lambda item: item[0])
+            if len(found) >= k and found[k - 1][0] <= ring * span:
+                break
+            if len(found) == len(self.keys) or ring * span > max_radius:
+                break
+            ring += 1
+        return [item for item in found[:k] if item[0] <= max_radius]
+
+
+class FreeCellIndex:
+    """
+    فهرس مكاني لخلايا الأرضية الصالحة للوقوف
+    مراكز الخلايا مرتبة حسب دلاء مربعة (bucket_size × bucket_size خلية)
+    مع جدول إزاحات لكل دلو، بحيث تفحص الاستعلامات الدلاء القريبة فقط
+    """
+
+    def __init__(self, world, radius, bucket_size=8):
+        self.cell_size = world.cell_size
+        self.bucket_span = bucket_size * world.cell_size
+        self.buckets_x = -(-world.cols // bucket_size)
+        self.buckets_y = -(-world.rows // bucket_size)
+
+        # خلايا الأرضية العادية (0) التي يتسع مركزها لكائن بنصف القطر المطلوب
+        xs, ys = [], []
+        for y0, tiles in world.tile_bands():
+            band_ys, band_xs = np.nonzero(tiles == 0)
+            xs.append(band_xs)
+            ys.append(band_ys + y0)
+        xs = np.concatenate(xs) if xs else np.zeros(0, dtype=np.intp)
+        ys = np.concatenate(ys) if ys else np.zeros(0, dtype=np.intp)
+        centers_x = xs * world.cell_size + world.cell_size // 2
+        centers_y = ys * world.cell_size + world.cell_size // 2
+        if radius < world.cell_size / 2:
+            valid = np.ones(len(xs), dtype=np.bool_)  # الكائن لا يتجاوز حدود خليته
+        else:
+            valid = world.are_valid_positions(centers_x, centers_y, radius)
+        xs, ys = xs[valid], ys[valid]
+
+        # ترتيب الخلايا حسب الدلو وحفظ بداية كل دلو (مثل CSR)
+        keys = (ys // bucket_size) * self.buckets_x + xs // bucket_size
+        order = np.argsort(keys, kind='stable')
+        self.xs = (centers_x[valid][order]).astype(np.int64)
+        self.ys = (centers_y[valid][order]).astype(np.int64)
+        counts = np.bincount(keys, minlength=self.buckets_x * self.buckets_y)
+        self.offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+
+    def __len__(self):
+        return len(self.xs)
+
+    def position(self, index):
+        return (int(self.xs[index]), int(self.ys[index]))
+
+    def bucket_range(self, pos, radius):
+        """نطاق الدلاء التي يغطيها مربع حول نقطة (مقيد بحدود الخريطة)"""
+        span = self.bucket_span
+        bx0 = max(0, int((pos[0] - radius) // span))
+        by0 = max(0, int((pos[1] - radius) // span))
+        bx1 = min(self.buckets_x - 1, int((pos[0] + radius) // span))
+        by1 = min(self.buckets_y - 1, int((pos[1] + radius) // span))
+        return bx0, by0, bx1, by1
+
+    def positions_within(self, pos, radius):
+        """كل مراكز الخلايا الحرة ضمن نصف قطر معين من نقطة"""
+        bx0, by0, bx1, by1 = self.bucket_range(pos, radius)
+        found = []
+        for by in range(by0, by1 + 1):
+            # دلاء الصف الواحد متتالية في المصفوفات
+            first = self.offsets[by * self.buckets_x + bx0]
+            last = self.offsets[by * self.buckets_x + bx1 + 1]
+            xs = self.xs[first:last]
+            ys = self.ys[first:last]
+            inside = (xs - pos[0]) ** 2 + (ys - pos[1]) ** 2 <= radius * radius
+            found.extend(zip(xs[inside].tolist(), ys[inside].tolist()))
+        return found
+
+    def far_buckets(self, pos, min_dist):
+        """أرقام الدلاء التي قد تحتوي خلايا على مسافة min_dist أو أكثر من النقطة"""
+        span = self.bucket_span
+        bx = np.arange(self.buckets_x) * span
+        by = np.arange(self.buckets_y) * span
+        far_x = np.maximum(np.abs(pos[0] - bx), np.abs(pos[0] - bx - span))
+        far_y = np.maximum(np.abs(pos[1] - by), np.abs(pos[1] - by - span))
+        far = np.hypot(far_x[None, :], far_y[:, None]) >= min_dist
+        return np.flatnonzero(far.ravel())
+
+    def random_position(self, min_dist=0, exclude_pos=None, avoid=(), spacing=0,
+                        max_attempts=32):
+        """
+        موقع حر عشوائي بعيد بما يكفي عن exclude_pos وعن كل نقاط avoid
+        Args:
+            min_dist: أقل مسافة عن exclude_pos
+            exclude_pos: (x, y) نقطة يجب الابتعاد عنها (اختياري)
+            avoid: نقاط أخرى يجب الابتعاد عنها بمسافة spacing، أو EntityHash (مثل الحراس)
+            spacing: أقل مسافة عن كل نقطة في avoid
+            max_attempts: عدد العينات العشوائية قبل المسح المنظم
+        Returns:
+            tuple (x, y) أو None إذا لم يوجد موقع يحقق الشروط
+        """
+        if not len(self.xs):
+            return None
+
+        # نقاط الاستبعاد في شبكة تجزئة بحجم spacing لفحص الجيران فقط
+        blockers = None
+        if spacing > 0:
+            if isinstance(avoid, EntityHash):
+                blockers = avoid
+            else:
+                blockers = EntityHash(spacing)
+                for point in avoid:
+                    blockers.insert(tuple(point), *point)
+
+        def accepts(pos):
+            if exclude_pos is not None and math.dist(pos, exclude_pos) < min_dist:
+                return False
+            return blockers is None or not blockers.any_within(pos, spacing)
+
+        # عينات عشوائية منتظمة: O(1) لكل محاولة وتنجح غالباً من أول مرة
+        for _ in range(max_attempts):
+            pos = self.position(random.randrange(len(self.xs)))
+            if accepts(pos):
+                return pos
+
+        # مسح منظم بترتيب عشوائي للدلاء البعيدة بما يكفي فقط
+        # يجد موقعاً إن وجد بدلاً من الاعتماد على الحظ
+        if exclude_pos is not None and min_dist > 0:
+            buckets = self.far_buckets(exclude_pos, min_dist).tolist()
+        else:
+            buckets = list(range(len(self.offsets) - 1))
+        random.shuffle(buckets)
+        for bucket in buckets:
+            first, last = int(self.offsets[bucket]), int(self.offsets[bucket + 1])
+            for index in random.sample(range(first, last), last - first):
+                pos = self.position(index)
+                if accepts(pos):
+                    return pos
+        return None
+
+
+class ClearanceField:
+    """
+    حقل المسافة إلى أقرب جدار بدقة أعلى من الخلية
+    كل عينة (resolution × resolution بكسل) تحفظ مسافة مضمونة بالبكسل من أي
+    نقطة داخلها إلى أقرب جدار، مقيدة بحجم الخلية (ما يكفي لأي كائن في اللعبة).
+    العينات تُحسب لكل قطعة (chunk_size × chunk_size خلية) عند أول استعلام
+    داخلها فقط، فالذاكرة والزمن يتناسبان مع المساحة التي تتحرك فيها الكائنات
+    وليس مع حجم الخريطة
+    """
+
+    # الدقة التلقائية حسب عدد الخلايا: أدق للخرائط الصغيرة، أخشن للكبيرة
+    AUTO_RESOLUTION = ((256 * 256, 4), (1024 * 1024, 8), (math.inf, 16))
+
+    def __init__(self, world, resolution, chunk_size=16):
+        cs = world.cell_size
+        if cs % resolution:
+            raise ValueError("resolution يجب أن تقسم cell_size")
+        rows, cols = world.rows, world.cols
+        self.world = world
+        self.cell_size = cs
+        self.sub = cs // resolution
+        self.resolution = resolution
+        self.width = cols * self.sub
+        self.height = rows * self.sub
+
+        # عدد الجدران الأربعة المجاورة لكل خلية (داخل الخريطة فقط) لتكاليف A*
+        padded = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+        padded[1:-1, 1:-1] = world.walls
+        self.adjacent_walls = (padded[2:, 1:-1] + padded[:-2, 1:-1] +
+                               padded[1:-1, 2:] + padded[1:-1, :-2])
+
+        # رقم صفحة كل قطعة في المخزن (-1 = لم تُحسب بعد)
+        self.chunk_size = chunk_size
+        self.span = chunk_size * self.sub  # عينات ضلع القطعة
+        self.chunks_x = -(-cols // chunk_size)
+        self.chunks_y = -(-rows // chunk_size)
+        self.slots = np.full(self.chunks_y * self.chunks_x, -1, dtype=np.int32)
+        self.used = 0
+        self.grow(4)
+
+        # المسافة من مراكز العينات إلى حدود الخلية (تُستخدم لكل قطعة)
+        local = (np.arange(self.sub) + 0.5) * resolution
+        edge = {-1: local, 0: np.zeros(self.sub), 1: cs - local}
+        self.to_wall = {
+            (dx, dy): np.hypot(edge[dx][None, :], edge[dy][:, None]).astype(np.float32)
+            for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+        }
+
+    @classmethod
+    def resolution_for(cls, world, resolution=None):
+        """resolution المطلوبة، أو تلقائية حسب حجم الخريطة إذا كانت None"""
+        if resolution:
+            return resolution
+        cells = world.cols * world.rows
+        for limit, resolution in cls.AUTO_RESOLUTION:
+            if cells <= limit and world.cell_size % resolution == 0:
+                return resolution
+        return 1
+
+    def grow(self, capacity):
+        pool = np.zeros((capacity, self.span, self.span), dtype=np.uint8)
+        if self.used:
+            pool[:self.used] = self.pool[:self.used]
+        self.pool = pool
+        self.flat = memoryview(pool.reshape(-1))  # نفس الذاكرة لاستعلامات مفردة سريعة
+
+    def build_chunk(self, chunk):
+        """حساب عينات قطعة واحدة؛ يعيد رقم صفحتها"""
+        n, sub, cs = self.chunk_size, self.sub, self.cell_size
+        walls = self.world.walls
+        rows, cols = walls.shape
+        cy, cx = divmod(chunk, self.chunks_x)
+        r0, c0 = cy * n, cx * n
+        h, w = min(n, rows - r0), min(n, cols - c0)
+
+        # أي مسافة أقل من حجم الخلية تأتي من الخلايا التسع المحيطة فقط
+        # (خارج الخريطة يعتبر جداراً مثل is_wall)
+        solid = np.ones((h + 2, w + 2), dtype=np.bool_)
+        y0, y1 = max(r0 - 1, 0), min(r0 + h + 1, rows)
+        x0, x1 = max(c0 - 1, 0), min(c0 + w + 1, cols)
+        solid[y0 - r0 + 1:y1 - r0 + 1, x0 - c0 + 1:x1 - c0 + 1] = walls[y0:y1, x0:x1]
+
+        distance = np.full((h, w, sub, sub), float(cs), dtype=np.float32)
+        for (dx, dy), to_wall in self.to_wall.items():
+            wall = solid[1 + dy:h + 1 + dy, 1 + dx:w + 1 + dx]
+            np.minimum(distance, np.where(wall[..., None, None], to_wall, cs), out=distance)
+
+        # الحقل 1-Lipschitz: نطرح نصف قطر العينة ليصح لأي نقطة داخلها
+        distance -= self.resolution * math.sqrt(2) / 2
+        values = np.floor(np.clip(distance, 0, 255)).astype(np.uint8)
+
+        if self.used == len(self.pool):
+            self.grow(len(self.pool) * 2)
+        slot = self.used
+        self.used += 1
+        self.pool[slot, :h * sub, :w * sub] = values.transpose(0, 2, 1, 3).reshape(h * sub, w * sub)
+        self.slots[chunk] = slot
+        return slot
+
+    @property
+    def memory_bytes(self):
+        """الحجم بالبايت: القطع المحسوبة فقط، (cell_size / resolution)² لكل خلية فيها"""
+        return (self.used * self.span * self.span + self.adjacent_walls.nbytes +
+                self.slots.nbytes)
+
+    def clearance(self, x, y):
+        """المسافة المضمونة من النقطة إلى أقرب جدار (0 داخل الجدار أو خارج الخريطة)"""
+        ix = int(x // self.resolution)
+        iy = int(y // self.resolution)
+        if not (0 <= ix < self.width and 0 <= iy < self.height):
+            return 0
+        span = self.span
+        chunk = (iy // span) * self.chunks_x + ix // span
+        slot = self.slots[chunk]
+        if slot < 0:
+            slot = self.build_chunk(chunk)
+        return self.flat[(int(slot) * span + iy % span) * span + ix % span]
+
+    def fits(self, x, y, radius):
+        """هل تتسع النقطة لدائرة بنصف قطر معين (استعلام واحد)"""
+        return self.clearance(x, y) >= radius
+
+    def fits_many(self, xs, ys, radii):
+        """نسخة متجهة من fits"""
+        ix = np.floor_divide(xs, self.resolution).astype(np.intp)
+        iy = np.floor_divide(ys, self.resolution).astype(np.intp)
+        inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+        result = np.zeros(ix.shape, dtype=np.bool_)
+        ix, iy = ix[inside], iy[inside]
+        span = self.span
+        chunks = (iy // span) * self.chunks_x + ix // span
+        slots = self.slots[chunks]
+        if (slots < 0).any():
+            for chunk in np.unique(chunks[slots < 0]).tolist():
+                self.build_chunk(chunk)
+            slots = self.slots[chunks]
+        radii = np.broadcast_to(radii, result.shape)
+        result[inside] = self.pool[slots, iy % span, ix % span] >= radii[inside]
+        return result
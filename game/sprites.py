@@ -0,0 +1,171 @@
+import math
+import numpy as np
+import pygame
+from settings import *
+from .utils import draw_vision_cone
+from .squad import GUARD_STATES
+
+ANGLE_STEPS = 64  # عدد اتجاهات النظر المرسومة مسبقاً
+PULSE_STEPS = 32  # عدد مراحل نبض الهدف في الدورة الواحدة
+
+# لون الحارس حسب حالته (باقي الحالات بلونه الأساسي)
+GUARD_COLOR = 'red'
+GUARD_STATE_COLORS = {'chase': 'dark_red', 'investigate': 'orange'}
+
+
+def angle_index(direction):
+    """أقرب اتجاه مرسوم مسبقاً لزاوية بالدرجات"""
+    return round(direction * ANGLE_STEPS / 360) % ANGLE_STEPS
+
+
+def draw_player(radius, color, direction):
+    image = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+    pygame.draw.circle(image, color, (radius, radius), radius)
+
+    eye_dist = radius * 0.6
+    eye_radius = radius * 0.3
+    angle_rad = math.radians(direction)
+
+    left_eye = (radius + math.cos(angle_rad + math.pi/6) * eye_dist,
+                radius + math.sin(angle_rad + math.pi/6) * eye_dist)
+    right_eye = (radius + math.cos(angle_rad - math.pi/6) * eye_dist,
+                 radius + math.sin(angle_rad - math.pi/6) * eye_dist)
+
+    pygame.draw.circle(image, get_color('white'), left_eye, int(eye_radius))
+    pygame.draw.circle(image, get_color('white'), right_eye, int(eye_radius))
+    return image
+
+
+def draw_guard(radius, color, direction):
+    image = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+    pygame.draw.circle(image, color, (radius, radius), radius)
+
+    eye_dist = radius * 0.5
+    eye_radius = radius * 0.25
+    angle_rad = math.radians(direction)
+
+    left_eye = (radius + math.cos(angle_rad + math.pi/4) * eye_dist,
+                radius + math.sin(angle_rad + math.pi/4) * eye_dist)
+    right_eye = (radius + math.cos(angle_rad - math.pi/4) * eye_dist,
+                 radius + math.sin(angle_rad - math.pi/4) * eye_dist)
+
+    pygame.draw.circle(image, get_color('white'), left_eye, int(eye_radius))
+    pygame.draw.circle(image, get_color('white'), right_eye, int(eye_radius))
+
+    pupil_offset = eye_radius * 0.6
+    pygame.draw.circle(image, get_color('black'),
+                       (left_eye[0] + math.cos(angle_rad) * pupil_offset,
+                        left_eye[1] + math.sin(angle_rad) * pupil_offset),
+                       int(eye_radius/2))
+    pygame.draw.circle(image, get_color('black'),
+                       (right_eye[0] + math.cos(angle_rad) * pupil_offset,
+                        right_eye[1] + math.sin(angle_rad) * pupil_offset),
+                       int(eye_radius/2))
+    return image
+
+
+def guard_color(state):
+    return get_color(GUARD_STATE_COLORS.get(state, GUARD_COLOR))
+
+
+def draw_guard_vision(surface, guard):
+    """مخروط رؤية الحارس بلون حالته (للتصحيح)"""
+    if guard.state == "patrol":
+        alpha = 60 + int(guard.alert_level * 60)
+        color = (*get_color('yellow'), alpha)
+    elif guard.state == "chase":
+        color = (*get_color('red'), 180)
+    else:
+        color = (*get_color('blue'), 120)
+        
+    draw_vision_cone(
+        surface,
+        (int(guard.x), int(guard.y)),
+        guard.direction,
+        GUARD_SETTINGS['vision']['distance'] * (1 + guard.alert_level/2),
+        GUARD_SETTINGS['vision']['angle']/(2 - guard.alert_level),
+        color=color
+    )
+
+
+def draw_objective(radius, color, pulse):
+    image = pygame.Surface((radius*4, radius*4), pygame.SRCALPHA)
+    center = (radius*2, radius*2)
+    for alpha in range(30, 0, -5):
+        pygame.draw.circle(image, (*color, alpha//2), center, int(radius * 2 * pulse + alpha/3))
+
+    pygame.draw.circle(image, color, center, int(radius * pulse))
+    pygame.draw.circle(image, get_color('white'), center, int(radius * pulse/2))
+    return image
+
+
+class SpriteAtlas:
+    """
+    صور الكائنات مرسومة مسبقاً لكل اتجاه نظر (ANGLE_STEPS) ولون حالة ومرحلة نبض
+    الكائن يبدل مرجع صورته فقط بدلاً من مسحها وإعادة رسم الدوائر في كل إطار
+    """
+    frames = {}
+
+    @classmethod
+    def get(cls, key, build):
+        if key not in cls.frames:
+            cls.frames[key] = build()
+        return cls.frames[key]
+
+    @classmethod
+    def player(cls, radius, color, direction):
+        frames = cls.get(('player', radius, color), lambda: [
+            draw_player(radius, color, i * 360 / ANGLE_STEPS) for i in range(ANGLE_STEPS)
+        ])
+        return frames[angle_index(direction)]
+
+    @classmethod
+    def guard(cls, radius, color, direction):
+        return cls.guard_frames(radius, color)[angle_index(direction)]
+
+    @classmethod
+    def guard_frames(cls, radius, color):
+        """صور الحارس لكل الاتجاهات بلون واحد (مفهرسة برقم الاتجاه)"""
+        return cls.get(('guard', radius, color), lambda: [
+            draw_guard(radius, color, i * 360 / ANGLE_STEPS) for i in range(ANGLE_STEPS)
+        ])
+
+    @classmethod
+    def objective(cls, radius, color, pulse_timer):
+        """الصورة لمرحلة النبض 0.7 + 0.3 * sin(pulse_timer)"""
+        frames = cls.get(('objective', radius, color), lambda: [
+            draw_objective(radius, color, 0.7 + 0.3 * math.sin(i * 2 * math.pi / PULSE_STEPS))
+            for i in range(PULSE_STEPS)
+        ])
+        return frames[int(pulse_timer * PULSE_STEPS / (2 * math.pi)) % PULSE_STEPS]
+
+    @classmethod
+    def prebuild(cls):
+        """رسم كل الصور عند بدء اللعبة بدلاً من أول ظهور لكل حالة"""
+        cls.player(PLAYER_SETTINGS['size'], get_color('green'), 0)
+        for name in (GUARD_COLOR, *GUARD_STATE_COLORS.values()):
+            cls.guard(GUARD_SETTINGS['size'], get_color(name), 0)
+        cls.objective(OBJECTIVE_SETTINGS['size'], get_color(OBJECTIVE_SETTINGS['color']), 0)
+
+
+def draw_guards(surface, engine):
+    """رسم كل حراس GuardEngine باستدعاء blits واحد من أطلس الصور"""
+    n = engine.count
+    if not n:
+        return
+    angles = np.round(engine.direction[:n] * ANGLE_STEPS / 360).astype(np.int64) % ANGLE_STEPS
+    left = (engine.x[:n] - engine.radius[:n]).astype(np.int64)
+    top = (engine.y[:n] - engine.radius[:n]).astype(np.int64)
+    radii = engine.radius[:n].astype(np.int64).tolist()
+    states = engine.state[:n].tolist()
+    # صور كل الاتجاهات لكل (حجم، حالة) موجودة، ثم مرجع صورة واحد لكل حارس
+    frames = {key: SpriteAtlas.guard_frames(key[0], guard_color(GUARD_STATES[key[1]]))
+              for key in set(zip(radii, states))}
+    surface.blits([
+        (frames[radius, state][angle], (lx, ty))
+        for radius, state, angle, lx, ty in zip(radii, states, angles.tolist(),
+                                               left.tolist(), top.tolist())
+    ], doreturn=False)
+    if DEBUG_SETTINGS['visible']['vision']:
+        for guard in engine.guards:
+            draw_guard_vision(surface, guard)
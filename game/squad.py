@@ -0,0 +1,203 @@
+import numpy as np
+from settings import *
+from .spatial import EntityHash
+from .perception import VisionCuller, NoiseField, noise_range
+
+# حالات الحارس مخزنة كأرقام صغيرة في مصفوفة الحالة
+GUARD_STATES = ('patrol', 'investigate', 'search', 'chase')
+STATE_CODES = {name: code for code, name in enumerate(GUARD_STATES)}
+CHASE = STATE_CODES['chase']
+
+# نوع الحركة الحالية لكل حارس (يحدد ماذا يحدث عند الوصول إلى الهدف)
+MOVE_NONE, MOVE_PATH, MOVE_PATROL, MOVE_SEARCH = range(4)
+
+# زوايا تجربة الالتفاف حول العائق بنفس ترتيب GuardAgent.move_toward
+DETOUR_ANGLES = np.array([45, -45, 90, -90], dtype=np.float64)
+
+
+class GuardEngine:
+    """
+    محاكاة كل الحراس كبنية مصفوفات (structure of arrays)
+    المواقع والاتجاهات والحالات ومستويات التنبه وأهداف الحركة في مصفوفات NumPy
+    متوازية، وكائن GuardAgent مجرد عرض لصف واحد منها. كل إطار يُحسب التنبه والسمع
+    والرؤية والحركة لكل الحراس في خطوات متجهة، ولا يُستدعى كود بايثون الخاص
+    بالحارس إلا عند حدث (رؤية اللاعب، سماعه، فقدانه، أو الوصول إلى هدف)
+    """
+
+    FIELDS = ('x', 'y', 'direction', 'alert', 'path_timer', 'stuck_timer', 'stuck_limit',
+              'target_x', 'target_y', 'speed', 'radius')
+
+    def __init__(self, capacity=16):
+        self.count = 0
+        self.guards = []
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(capacity))
+        self.state = np.zeros(capacity, dtype=np.int8)
+        self.move = np.zeros(capacity, dtype=np.int8)
+        self.dirty = np.zeros(capacity, dtype=np.bool_)  # هدف الحركة يحتاج إعادة حساب
+        self.waiting = np.zeros(capacity, dtype=np.bool_)  # ينتظر مساراً من المجدول
+        # أرقام الصفوف في شبكة تجزئة بخلايا العالم؛ المواقع الدقيقة تُقرأ من المصفوفات
+        self.hash = EntityHash(WORLD_SETTINGS['cell_size'],
+                               position=lambda i: (self.x[i], self.y[i]))
+        self.vision = VisionCuller()
+
+    def add(self, guard):
+        """حجز صف جديد للحارس؛ يعيد رقم الصف"""
+        if self.count == len(self.x):
+            for name in self.FIELDS + ('state', 'move', 'dirty', 'waiting'):
+                old = getattr(self, name)
+                grown = np.zeros(len(old) * 2, dtype=old.dtype)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+        index = self.count
+        self.count += 1
+        self.guards.append(guard)
+        self.dirty[index] = True
+        self.hash.insert(index, self.x[index], self.y[index])
+        return index
+
+    def relocate(self, index):
+        """نقل صف إلى دلو موقعه الجديد في شبكة التجزئة (بعد تغيير x أو y مباشرة)"""
+        self.hash.move(index, self.x[index], self.y[index])
+
+    def step(self, player, world):
+        """
+        تحديث كل الحراس إطاراً واحداً (بنفس ترتيب GuardAgent.update)
+        Returns:
+            "caught" إذا أمسك أحد الحراس اللاعب، وإلا None
+        """
+        n = self.count
+        if not n:
+            return None
+        guards = self.guards
+        self.path_timer[:n] -= 1/FPS
+
+        # المسارات التي وصلت من المجدول
+        for i in np.flatnonzero(self.waiting[:n]):
+            guards[i].poll_path_request()
+
+        state = self.state[:n]
+        chase = state == CHASE
+        alert = self.alert[:n]
+        alert[:] = np.where(chase, np.minimum(1.0, alert + 0.05), np.maximum(0.0, alert - 0.01))
+
+        # كل فحوص القرب (الإمساك، الرؤية، السمع) على الحراس في خلايا قريبة من اللاعب فقط
+        target = (player.x, player.y)
+        vision = GUARD_SETTINGS['vision']
+        loudness = noise_range(player)
+        reach = max(GUARD_SETTINGS['behavior']['catch_radius'],
+                    vision['distance'] * 1.5, loudness * 2)  # أقصى قيم عند تنبه كامل
+        near = np.array(self.hash.near(target, reach), dtype=np.intp)
+
+        # الرؤية: المسافة ثم مخروط النظر بشكل متجه، وخط الرؤية للباقين فقط
+        seen_near, dist = self.vision.see(
+            self.x[near], self.y[near], self.direction[near], alert[near], target, world, total=n
+        )
+
+        # الإمساك: الحراس المطاردون القريبون فقط يحتاجون خط رؤية
+        for i in near[chase[near] & (dist < GUARD_SETTINGS['behavior']['catch_radius'])]:
+            if world.has_line_of_sight((self.x[i], self.y[i]), target):
+                return "caught"
+
+        seen = np.zeros(n, dtype=np.bool_)
+        seen[near] = seen_near
+
+        lost = chase & ~seen
+        for i in np.flatnonzero(seen):
+            guards[i].handle_player_detected(player, world)
+        for i in np.flatnonzero(lost):
+            guards[i].handle_lost_player(player, world)
+        self.dirty[:n] |= seen | lost
+
+        if loudness:
+            # مسافة الصوت عبر الممرات؛ الحقل لا يتجاوز ضعف المدى فيكفي مرشحو الشبكة
+            if SOUND_SETTINGS['propagation']['enabled']:
+                field = NoiseField.for_world(world)
+                field.update(target, loudness)
+                dist = field.distances(self.x[near], self.y[near])
+            heard = near[dist < loudness * (1 + self.alert[near])]
+            for i in heard:
+                guards[i].distract(target, world)
+            self.dirty[heard] = True
+
+        self.refresh_targets(world)
+        self.advance(world)
+
+    def refresh_targets(self, world):
+        """إعادة حساب هدف الحركة للحراس الذين تغير مسارهم أو حالتهم"""
+        for i in np.flatnonzero(self.dirty[:self.count]):
+            move, target, speed = self.guards[i].movement_target(world)
+            self.move[i] = move
+            self.dirty[i] = move == MOVE_NONE  # لا هدف الآن: المحاولة في الإطار التالي
+            if target is not None:
+                self.target_x[i], self.target_y[i] = target
+                self.speed[i] = speed
+
+    def advance(self, world):
+        """نسخة متجهة من GuardAgent.move_toward لكل الحراس المتحركين"""
+        n = self.count
+        x, y, direction = self.x[:n], self.y[:n], self.direction[:n]
+        moving = self.move[:n] != MOVE_NONE
+
+        # الدورية: عداد العلوق ينتقل للنقطة التالية إذا لم تُبلغ النقطة في الوقت المحدد
+        patrol = self.move[:n] == MOVE_PATROL
+        if patrol.any():
+            near = np.hypot(self.target_x[:n] - x, self.target_y[:n] - y) < 10
+            stuck = self.stuck_timer[:n]
+            stuck[:] = np.where(patrol & near, 0.0, np.where(patrol, stuck + 1/FPS, stuck))
+            # مثل GuardAgent.patrol: الحركة في هذا الإطار ما زالت نحو الهدف القديم
+            for i in np.flatnonzero(patrol & (stuck > self.stuck_limit[:n])):
+                self.guards[i].skip_patrol_point()
+                self.dirty[i] = True
+
+        dx = self.target_x[:n] - x
+        dy = self.target_y[:n] - y
+        dist = np.hypot(dx, dy)
+        arrived = moving & (dist < 10)
+        active = np.flatnonzero(moving & ~arrived)
+
+        if len(active):
+            ax, ay = x[active], y[active]
+            adx, ady, adist = dx[active], dy[active], dist[active]
+            step = np.minimum(self.speed[active], adist)
+            new_x = ax + adx / adist * step
+            new_y = ay + ady / adist * step
+            radii = self.radius[active] + 5  # نفس هامش الأمان في move_toward
+            can_x = world.are_valid_positions(new_x, ay, radii)
+            can_y = world.are_valid_positions(ax, new_y, radii)
+
+            # عالق في الاتجاهين: تجربة الالتفاف بزوايا حول اتجاه النظر
+            blocked = np.flatnonzero(~can_x & ~can_y)
+            if len(blocked):
+                angles = np.radians(direction[active[blocked], None] + DETOUR_ANGLES)
+                test_x = ax[blocked, None] + np.cos(angles) * step[blocked, None]
+                test_y = ay[blocked, None] + np.sin(angles) * step[blocked, None]
+                ok = world.are_valid_positions(
+                    test_x, test_y, np.repeat(radii[blocked], len(DETOUR_ANGLES))
+                ).reshape(len(blocked), len(DETOUR_ANGLES))
+                found = ok.any(axis=1)
+                first = ok.argmax(axis=1)
+                rows = blocked[found]
+                new_x[rows] = test_x[found, first[found]]
+                new_y[rows] = test_y[found, first[found]]
+                can_x[rows] = can_y[rows] = True
+
+            x[active] = np.where(can_x, new_x, ax)
+            y[active] = np.where(can_y, new_y, ay)
+
+            # تحديث شبكة التجزئة فقط للحراس الذين عبروا حد خلية
+            cell = self.hash.cell_size
+            crossed = ((np.floor_divide(x[active], cell) != np.floor_divide(ax, cell)) |
+                       (np.floor_divide(y[active], cell) != np.floor_divide(ay, cell)))
+            for i in active[crossed]:
+                self.hash.move(i, x[i], y[i])
+            moved = can_x | can_y
+            turning = active[moved]
+            target_angle = np.degrees(np.arctan2(ady[moved], adx[moved]))
+            angle_diff = np.mod(target_angle - direction[turning] + 180, 360) - 180
+            direction[turning] += angle_diff * 0.1  # تعديل تدريجي للاتجاه
+            arrived[active[~moved]] = True  # لا حركة ممكنة: مثل الوصول
+
+        for i in np.flatnonzero(arrived):
+            self.guards[i].arrive(world)
+            self.dirty[i] = True
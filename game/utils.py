@@ -1,4 +1,7 @@
-import pygame
+try:
+    import pygame
+except ImportError:  # دوال الرسم فقط تحتاج pygame
+    pygame = None
 import math
 from settings import *
 
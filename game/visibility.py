@@ -0,0 +1,108 @@
+import math
+from array import array
+
+
+class VisibilitySet:
+    """
+    جدول الرؤية المحسوب مسبقاً (PVS) بين خلايا الأرضية
+    لكل خلية أرضية مجموعة بتات مضغوطة تحدد الخلايا التي يمكن رؤيتها منها
+    """
+
+    def __init__(self, world, max_distance):
+        self.cols = world.cols
+        self.rows = world.rows
+        self.cell_size = world.cell_size
+        self.max_cells = int(math.ceil(max_distance / world.cell_size))
+
+        # ترقيم خلايا الأرضية فقط (-1 للجدران)
+        self.cell_index = array('i', [-1]) * (self.cols * self.rows)
+        self.floor_cells = []
+        for cell, solid in enumerate(world.occupancy):
+            if not solid:
+                self.cell_index[cell] = len(self.floor_cells)
+                self.floor_cells.append(cell)
+
+        count = len(self.floor_cells)
+        self.row_bytes = (count + 7) // 8
+        self.bits = bytearray(count * self.row_bytes)
+        self.bake(world)
+
+    @property
+    def memory_bytes(self):
+        """حجم الجدول في الذاكرة بالبايت"""
+        return len(self.bits) + self.cell_index.itemsize * len(self.cell_index)
+
+    def bake(self, world):
+        """
+        تعليم الأزواج التي قد تتبادل الرؤية (تقدير محافظ: لا يرفض زوجاً مرئياً أبداً)
+        أي قطعة من نقطة في الخلية A إلى نقطة في B تعبر سلسلة خلايا رتيبة في
+        المحورين نحو B، كل خلية فيها مجاورة للسابقة (بضلع أو زاوية)، وتتبع الشعاع
+        بالطريقتين لا ينجح إلا إذا كانت كل خلايا السلسلة أرضية. فإذا لم توجد سلسلة
+        رتيبة من خلايا أرضية من A إلى B فالزوج محجوب لكل النقاط بالتأكيد.
+        الوصول الرتيب يُحسب لكل مصدر في كل ربع دفعة واحدة بأقنعة بتات للصفوف
+        """
+        cols, rows = self.cols, self.rows
+        reach = self.max_cells
+        width = (1 << (reach + 1)) - 1
+        index = self.cell_index
+        occupancy = world.occupancy
+
+        # قناع الخلايا الأرضية لكل صف (البت x) ونسخة معكوسة للاتجاه السالب
+        free = []
+        mirrored = []
+        for y in range(rows):
+            row = occupancy[y * cols:(y + 1) * cols]
+            bits = int(''.join('0' if solid else '1' for solid in reversed(row)) or '0', 2)
+            free.append(bits)
+            mirrored.append(int(format(bits, f'0{cols}b')[::-1] or '0', 2) if cols else 0)
+
+        for i, cell in enumerate(self.floor_cells):
+            x, y = cell % cols, cell // cols
+            for sx in (1, -1):
+                masks = free if sx > 0 else mirrored
+                shift = x if sx > 0 else cols - 1 - x
+                for sy in (1, -1):
+                    reached = 1  # الخلية نفسها في البت 0
+                    for dy in range(reach + 1):
+                        ny = y + sy * dy
+                        if not 0 <= ny < rows:
+                            break
+                        row = (masks[ny] >> shift) & width
+                        if dy:
+                            # من الخلية تحتها مباشرة أو قطرياً من الخلية السابقة لها
+                            reached = row & (reached | reached << 1)
+                        # الامتداد داخل الصف نحو الاتجاه الموجب عبر خلايا أرضية متصلة
+                        reached = (((reached + row) ^ row) | reached) & row
+                        if not reached:
+                            break
+                        base = ny * cols + x
+                        bits = reached
+                        while bits:
+                            low = bits & -bits
+                            j = index[base + sx * (low.bit_length() - 1)]
+                            self.bits[i * self.row_bytes + (j >> 3)] |= 1 << (j & 7)
+                            bits ^= low
+
+    def in_range(self, cell_a, cell_b):
+        """هل الزوج ضمن المدى المحسوب في الجدول"""
+        dx = abs(cell_a % self.cols - cell_b % self.cols)
+        dy = abs(cell_a // self.cols - cell_b // self.cols)
+        return max(dx, dy) <= self.max_cells
+
+    def set_visible(self, i, j):
+        self.bits[i * self.row_bytes + (j >> 3)] |= 1 << (j & 7)
+
+    def is_visible(self, i, j):
+        return self.bits[i * self.row_bytes + (j >> 3)] >> (j & 7) & 1
+
+    def might_see(self, cell_a, cell_b):
+        """
+        اختبار O(1) قبل تتبع الشعاع
+        Returns:
+            False فقط إذا كانت الخلايا محجوبة بالتأكيد، True خلاف ذلك
+        """
+        i = self.cell_index[cell_a]
+        j = self.cell_index[cell_b]
+        if i < 0 or j < 0 or not self.in_range(cell_a, cell_b):
+            return True
+        return bool(self.is_visible(i, j))
@@ -0,0 +1,70 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import settings
+from .world import World
+from .ai import AStar
+
+# إعدادات تُنسخ إلى العمليات العاملة (قد تكون عُدلت بعد الاستيراد)
+SHARED_SETTINGS = ('AI_SETTINGS', 'WORLD_SETTINGS', 'GUARD_SETTINGS', 'PLAYER_SETTINGS')
+
+# نسخة العالم داخل كل عملية عاملة (للقراءة فقط)
+worker_world = None
+
+
+def init_worker(grid, overrides):
+    """تهيئة العملية العاملة: نفس الإعدادات ونسخة من شبكة العالم"""
+    global worker_world
+    for name, values in overrides.items():
+        getattr(settings, name).update(values)
+    worker_world = World(grid)
+
+
+def search_task(grid_start, grid_end):
+    """بحث A* كامل داخل العملية العاملة؛ المسار الناتج يُرسل كنقاط بالبكسل"""
+    return AStar.search(grid_start, grid_end, worker_world)
+
+
+class PathWorkerPool:
+    """
+    مجموعة عمليات خلفية لبحث المسارات خارج حلقة اللعبة
+    كل عملية تحمل نسخة من شبكة العالم وتبني رسم التنقل بنفسها، فلا يتنافس
+    البحث مع الرسم على مفسر بايثون الرئيسي. عند تغير الشبكة تُستبدل العمليات
+    بأخرى تحمل الشبكة الجديدة
+    """
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.executor = None
+        self.world = None
+        self.grid_version = None
+        self.restarts = 0
+
+    def sync(self, world):
+        """التأكد من أن العمليات تحمل نفس إصدار الشبكة"""
+        if self.executor is not None and self.world is world and \
+                self.grid_version == world.grid_version:
+            return
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.restarts += 1
+        grid = np.asarray(world.grid, dtype=np.uint8).reshape(world.rows, world.cols)
+        overrides = {name: dict(getattr(settings, name)) for name in SHARED_SETTINGS}
+        # spawn بدلاً من fork: العملية الرئيسية تحمل حالة SDL ونافذة العرض
+        self.executor = ProcessPoolExecutor(
+            self.processes, mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker, initargs=(grid, overrides)
+        )
+        self.world = world
+        self.grid_version = world.grid_version
+
+    def submit(self, request):
+        """إرسال طلب إلى العمليات؛ يعيد Future بالمسار"""
+        self.sync(request.world)
+        return self.executor.submit(search_task, request.grid_start, request.grid_end)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            self.world = None
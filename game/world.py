@@ -1,12 +1,31 @@
-import pygame
+try:
+    import pygame
+except ImportError:  # رسم العالم فقط يحتاج pygame؛ التصادم والمسارات تعمل بدونه
+    pygame = None
 import math
-import random
+import itertools
+import numpy as np
 from settings import *
+from .visibility import VisibilitySet
+from .levels import load_level
+from .spatial import FreeCellIndex, ClearanceField
+from .routing import NextHopTable
+from .navigation import NavGraph
+from .hpa import HierarchicalPathfinder
+from .jps import JumpPointSearch
+
+# عداد عام لإصدارات الشبكة (فريد عبر كل العوالم)
+_grid_versions = itertools.count(1)
+
+# إزاحات نقاط فحص التصادم: المركز ثم الزوايا الأربع
+_PROBE_DX = np.array([0, -1, 1, -1, 1])
+_PROBE_DY = np.array([0, -1, -1, 1, 1])
 
 class World:
-    def __init__(self):
+    def __init__(self, grid=None):
         # خريطة اللعب (1 = جدار، 0 = أرضية، 2 = نقطة البداية، 3 = نقطة النهاية)
-        self.grid = [
+        # أي شبكة تدعم grid[y][x] و len(grid): قائمة صفوف، مصفوفة NumPy أو TileMap
+        self.grid = grid if grid is not None else [
             [1,1,1,1,1,1,1,1,1,1,1,1,1,1,1,1],
             [1,2,0,0,1,0,0,0,1,0,0,0,1,0,0,1],
             [1,0,1,0,1,1,1,0,1,0,1,0,1,0,1,1],
@@ -28,11 +47,139 @@ class World:
         self.floor_highlight = get_color('dark_gray', 50)
         self.start_color = get_color('green')
         self.end_color = get_color('blue')
+        self._derived = {}
+        self.mark_dirty()
+        
+        # البيانات المشتقة المفعلة تُبنى عند التحميل وليس في أول إطار
+        if WORLD_SETTINGS['clearance']['enabled']:
+            self.get_clearance()
+        if WORLD_SETTINGS['pvs']['enabled']:
+            self.get_visibility()
+        # رسم التنقل وجداول خلفية البحث المختارة، حتى لا يبنيها أول بحث أثناء اللعب
+        NavGraph.for_world(self)
+        backend = AI_SETTINGS['pathfinding']['backend']
+        if backend == 'table':
+            NextHopTable.for_world(self)
+        elif backend == 'hpa':
+            HierarchicalPathfinder.for_world(self)
+        elif backend == 'jps':
+            JumpPointSearch.for_world(self)
+
+    @classmethod
+    def load(cls, path):
+        """إنشاء عالم من ملف مستوى ثنائي (يُقرأ عند الحاجة عبر memory mapping)"""
+        return cls(load_level(path))
+
+    def mark_dirty(self):
+        """تسجيل تغير الشبكة لإعادة بناء كل البيانات المشتقة منها"""
+        self.rows = len(self.grid)
+        self.cols = len(self.grid[0]) if self.rows else 0
+        self.build_occupancy()
+        self.touch()
+
+    def touch(self):
+        """رفع إصدار الشبكة وإلغاء البيانات المشتقة المخزنة"""
+        self.grid_version = next(_grid_versions)
+        self._derived.clear()
+
+    def build_occupancy(self):
+        """
+        بناء شبكة الإشغال المضغوطة (بايت لكل خلية، 1 = جدار)
+        occupancy مسطحة للاستعلامات المفردة و walls عرض NumPy لنفس الذاكرة
+        """
+        self.occupancy = bytearray(self.rows * self.cols)
+        self.walls = np.frombuffer(self.occupancy, dtype=np.bool_).reshape(self.rows, self.cols)
+        for y0, tiles in self.tile_bands():
+            self.walls[y0:y0 + len(tiles)] = tiles == 1
+
+    def tile_bands(self):
+        """
+        الشبكة كشرائح صفوف متتالية (y0، مصفوفة uint8)
+        ملف المستوى يُقرأ صف قطع بعد صف عبر TileMap.region، فلا تُنسخ الخريطة
+        كاملة في الذاكرة؛ الشبكات الموجودة في الذاكرة شريحة واحدة
+        """
+        if hasattr(self.grid, 'region'):
+            band = self.grid.chunk_size
+            for y0 in range(0, self.rows, band):
+                yield y0, self.grid.region(0, y0, self.cols, min(y0 + band, self.rows))
+        elif self.rows:
+            yield 0, np.asarray(self.grid, dtype=np.uint8).reshape(self.rows, self.cols)
+
+    def set_grid(self, grid):
+        """استبدال الشبكة بالكامل"""
+        self.grid = grid
+        self.mark_dirty()
+
+    def set_tile(self, x, y, tile):
+        """تغيير خلية واحدة في الشبكة"""
+        if self.grid[y][x] != tile:
+            self.grid[y][x] = tile
+            self.occupancy[y * self.cols + x] = tile == 1
+            self.touch()
+
+    def get_derived(self, key, build):
+        """
+        الحصول على بيانات مشتقة من الشبكة مع تخزين مؤقت
+        يعاد بناؤها فقط عند تغير الشبكة
+        """
+        if key not in self._derived:
+            self._derived[key] = build()
+        return self._derived[key]
 
     def draw(self, surface):
-        """رسم خريطة اللعب مع تأثيرات بصرية محسنة"""
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
+        """رسم خريطة اللعب: طبقة ثابتة مخزنة ثم العناصر المتحركة فوقها"""
+        background = self.get_derived(
+            ('background', surface.get_size(), surface.get_bitsize()),
+            lambda: self.bake_background(surface)
+        )
+        surface.blit(background, (0, 0))
+        
+        # نقاط البداية فقط متحركة (تأثير النبض)
+        for rect in self.get_derived('start_rects', self.find_start_rects):
+            self.draw_start_pulse(surface, rect)
+
+    def visible_cells(self, size):
+        """عدد الأعمدة والصفوف الظاهرة على سطح بحجم معين"""
+        cols = min(self.cols, -(-size[0] // self.cell_size))
+        rows = min(self.rows, -(-size[1] // self.cell_size))
+        return cols, rows
+
+    def find_start_rects(self):
+        """مستطيلات خلايا البداية (العناصر المتحركة الوحيدة)"""
+        return [
+            pygame.Rect(x * self.cell_size, y * self.cell_size, self.cell_size, self.cell_size)
+            for x, y in self.find_tiles(2)
+        ]
+
+    def find_tiles(self, tile):
+        """كل الخلايا (x, y) بقيمة معينة بترتيب الصفوف"""
+        def build():
+            cells = []
+            for y0, tiles in self.tile_bands():
+                ys, xs = np.nonzero(tiles == tile)
+                cells.extend(zip(xs.tolist(), (ys + y0).tolist()))
+            return cells
+        return self.get_derived(('tiles', tile), build)
+
+    def find_tile(self, tile):
+        """أول خلية بقيمة معينة، أو None"""
+        marker = getattr(self.grid, 'markers', {}).get(tile)
+        if marker is not None:
+            return marker  # محفوظة في ترويسة ملف المستوى
+        cells = self.find_tiles(tile)
+        return cells[0] if cells else None
+
+    def bake_background(self, surface):
+        """رسم كل الخلايا الثابتة مرة واحدة على سطح مخزن"""
+        cols, rows = self.visible_cells(surface.get_size())
+        background = pygame.Surface(
+            (cols * self.cell_size, rows * self.cell_size), 0, surface
+        )
+        
+        for y in range(rows):
+            row = self.grid[y]
+            for x in range(cols):
+                tile = row[x]
                 rect = pygame.Rect(
                     x * self.cell_size,
                     y * self.cell_size,
@@ -41,13 +188,15 @@ class World:
                 )
                 
                 if tile == 1:  # جدار
-                    self.draw_wall(surface, rect)
+                    self.draw_wall(background, rect)
                 elif tile == 2:  # نقطة البداية
-                    self.draw_start(surface, rect)
+                    self.draw_start(background, rect)
                 elif tile == 3:  # نقطة النهاية
-                    self.draw_end(surface, rect)
+                    self.draw_end(background, rect)
                 else:  # أرضية
-                    self.draw_floor(surface, rect)
+                    self.draw_floor(background, rect)
+        
+        return background
 
     def draw_wall(self, surface, rect):
         """رسم الجدار مع تأثيرات ثلاثية الأبعاد"""
@@ -73,15 +222,17 @@ class World:
             pygame.draw.rect(surface, self.floor_highlight, pattern_rect)
 
     def draw_start(self, surface, rect):
-        """رسم نقطة البداية"""
+        """رسم الجزء الثابت من نقطة البداية"""
         pygame.draw.rect(surface, self.floor_color, rect)
         center = rect.center
         radius = self.cell_size // 4
         pygame.draw.circle(surface, self.start_color, center, radius)
-        
-        # تأثير النبض
+
+    def draw_start_pulse(self, surface, rect):
+        """رسم تأثير النبض فوق نقطة البداية"""
+        radius = self.cell_size // 4
         pulse = 0.8 + 0.2 * math.sin(pygame.time.get_ticks() * 0.005)
-        pygame.draw.circle(surface, get_color('white'), center, int(radius * pulse), 2)
+        pygame.draw.circle(surface, get_color('white'), rect.center, int(radius * pulse), 2)
 
     def draw_end(self, surface, rect):
         """رسم نقطة النهاية"""
@@ -99,27 +250,19 @@ class World:
 
     def get_start_position(self):
         """الحصول على موقع نقطة البداية"""
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if tile == 2:
-                    return (
-                        x * self.cell_size + self.cell_size // 2,
-                        y * self.cell_size + self.cell_size // 2
-                    )
+        cell = self.find_tile(2)
+        if cell is not None:
+            return self.get_cell_center(cell)
         return (self.cell_size, self.cell_size)  # موقع افتراضي
 
     def get_end_position(self):
         """الحصول على موقع نقطة النهاية"""
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                if tile == 3:
-                    return (
-                        x * self.cell_size + self.cell_size // 2,
-                        y * self.cell_size + self.cell_size // 2
-                    )
+        cell = self.find_tile(3)
+        if cell is not None:
+            return self.get_cell_center(cell)
         return (
-            len(self.grid[0]) * self.cell_size - self.cell_size,
-            len(self.grid) * self.cell_size - self.cell_size
+            self.cols * self.cell_size - self.cell_size,
+            self.rows * self.cell_size - self.cell_size
         )
 
     def is_wall(self, x, y):
@@ -127,30 +270,177 @@ class World:
         grid_x = int(x // self.cell_size)
         grid_y = int(y // self.cell_size)
         
-        if 0 <= grid_x < len(self.grid[0]) and 0 <= grid_y < len(self.grid):
-            return self.grid[grid_y][grid_x] == 1
+        if 0 <= grid_x < self.cols and 0 <= grid_y < self.rows:
+            return self.occupancy[grid_y * self.cols + grid_x] == 1
         return True  # اعتبار كل شيء خارج الخريطة جدارًا
 
+    def get_clearance(self):
+        """حقل المسافة إلى أقرب جدار (يعاد حسابه فقط عند تغير الشبكة)"""
+        settings = WORLD_SETTINGS['clearance']
+        resolution = ClearanceField.resolution_for(self, settings['resolution'])
+        return self.get_derived(('clearance', resolution, settings['chunk_size']),
+                                lambda: ClearanceField(self, resolution, settings['chunk_size']))
+
     def is_valid_position(self, x, y, radius):
         """تحقق إذا كان الموقع صالحًا لكائن بحجم معين"""
-        # التحقق من المركز
-        if self.is_wall(x, y):
+        if WORLD_SETTINGS['clearance']['enabled']:
+            # استعلام واحد في حقل المسافة بدل فحص الزوايا
+            return self.get_clearance().fits(x, y, radius)
+        
+        # التحقق من المركز ثم الزوايا الأربع
+        is_wall = self.is_wall
+        return not (
+            is_wall(x, y) or
+            is_wall(x - radius, y - radius) or
+            is_wall(x + radius, y - radius) or
+            is_wall(x - radius, y + radius) or
+            is_wall(x + radius, y + radius)
+        )
+
+    def are_walls(self, xs, ys):
+        """
+        نسخة متجهة من is_wall لعدة نقاط دفعة واحدة
+        Args:
+            xs, ys: مصفوفات إحداثيات بالبكسل (بنفس الشكل)
+        Returns:
+            np.ndarray - مصفوفة منطقية بنفس الشكل
+        """
+        grid_x = np.floor_divide(xs, self.cell_size).astype(np.intp)
+        grid_y = np.floor_divide(ys, self.cell_size).astype(np.intp)
+        inside = (grid_x >= 0) & (grid_x < self.cols) & (grid_y >= 0) & (grid_y < self.rows)
+        
+        result = np.ones(grid_x.shape, dtype=np.bool_)
+        result[inside] = self.walls[grid_y[inside], grid_x[inside]]
+        return result
+
+    def are_valid_positions(self, xs, ys, radii):
+        """
+        نسخة متجهة من is_valid_position لعدة مرشحين في استدعاء واحد
+        Args:
+            xs, ys: إحداثيات المرشحين بالبكسل
+            radii: نصف القطر (قيمة واحدة أو قيمة لكل مرشح)
+        Returns:
+            np.ndarray - True للمواقع الصالحة
+        """
+        if WORLD_SETTINGS['clearance']['enabled']:
+            return self.get_clearance().fits_many(
+                np.asarray(xs, dtype=np.float64).ravel(),
+                np.asarray(ys, dtype=np.float64).ravel(),
+                np.asarray(radii, dtype=np.float64).ravel() if np.ndim(radii) else radii
+            )
+        
+        xs = np.asarray(xs, dtype=np.float64).reshape(-1, 1)
+        ys = np.asarray(ys, dtype=np.float64).reshape(-1, 1)
+        radii = np.asarray(radii, dtype=np.float64).reshape(-1, 1)
+        
+        blocked = self.are_walls(xs + radii * _PROBE_DX, ys + radii * _PROBE_DY)
+        return ~blocked.any(axis=1)
+
+    def cell_id(self, pos):
+        """رقم الخلية المسطح لموقع بالبكسل (None خارج الخريطة)"""
+        grid_x = int(pos[0] // self.cell_size)
+        grid_y = int(pos[1] // self.cell_size)
+        if 0 <= grid_x < self.cols and 0 <= grid_y < self.rows:
+            return grid_y * self.cols + grid_x
+        return None
+
+    def get_visibility(self):
+        """جدول الرؤية المحسوب مسبقاً بين خلايا الأرضية"""
+        settings = WORLD_SETTINGS['pvs']
+        return self.get_derived('pvs', lambda: VisibilitySet(
+            self, settings['max_distance']
+        ))
+
+    def has_line_of_sight(self, pos1, pos2, precision=2, exact=None):
+        """
+        تحقق إذا كان هناك خط رؤية مباشر بين نقطتين
+        Args:
+            pos1, pos2: (x, y) بالبكسل
+            precision: المسافة بين العينات في الوضع القديم
+            exact: True لتتبع الخلايا، False لأخذ العينات
+                   (None = حسب WORLD_SETTINGS['line_of_sight'])
+        """
+        if WORLD_SETTINGS['pvs']['enabled']:
+            # رفض سريع للأزواج المحجوبة قبل أي تتبع للشعاع
+            cell_a = self.cell_id(pos1)
+            cell_b = self.cell_id(pos2)
+            if (cell_a is not None and cell_b is not None and
+                    not self.get_visibility().might_see(cell_a, cell_b)):
+                return False
+        
+        if exact is None:
+            exact = WORLD_SETTINGS['line_of_sight'] == 'exact'
+        if exact:
+            return self.trace_line_of_sight(pos1, pos2)
+        return self.sample_line_of_sight(pos1, pos2, precision)
+
+    def trace_line_of_sight(self, pos1, pos2):
+        """
+        خط رؤية دقيق بتتبع الخلايا التي يعبرها القطعة فقط (DDA)
+        التكلفة تتناسب مع عدد الخلايا وليس عدد البكسلات
+        """
+        cs = self.cell_size
+        cols, rows = self.cols, self.rows
+        occupancy = self.occupancy
+        x0, y0 = pos1
+        x1, y1 = pos2
+        
+        cx, cy = int(x0 // cs), int(y0 // cs)
+        end_x, end_y = int(x1 // cs), int(y1 // cs)
+        if not (0 <= cx < cols and 0 <= cy < rows) or occupancy[cy * cols + cx]:
             return False
+        
+        dx = x1 - x0
+        dy = y1 - y0
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        
+        # المسافة (كنسبة من القطعة) حتى الحد التالي للخلية وبين حدين متتاليين
+        if dx:
+            next_x = ((cx + 1) * cs - x0) / dx if dx > 0 else (cx * cs - x0) / dx
+            delta_x = cs / abs(dx)
+        else:
+            next_x = delta_x = math.inf
+        if dy:
+            next_y = ((cy + 1) * cs - y0) / dy if dy > 0 else (cy * cs - y0) / dy
+            delta_y = cs / abs(dy)
+        else:
+            next_y = delta_y = math.inf
+        
+        remaining = abs(end_x - cx) + abs(end_y - cy)
+        while remaining > 0:
+            if next_x < next_y:
+                cx += step_x
+                next_x += delta_x
+                remaining -= 1
+            elif next_y < next_x or remaining == 1:
+                if next_y < next_x or cx == end_x:
+                    cy += step_y
+                    next_y += delta_y
+                else:
+                    cx += step_x
+                    next_x += delta_x
+                remaining -= 1
+            else:
+                # القطعة تمر بزاوية الخلية تماماً: لا تسمح بالرؤية عبر زاوية جدار
+                for sx, sy in ((cx + step_x, cy), (cx, cy + step_y)):
+                    if not (0 <= sx < cols and 0 <= sy < rows) or occupancy[sy * cols + sx]:
+                        return False
+                cx += step_x
+                cy += step_y
+                next_x += delta_x
+                next_y += delta_y
+                remaining -= 2
             
-        # التحقق من الزوايا الأربع
-        points = [
-            (x - radius, y - radius),
-            (x + radius, y - radius),
-            (x - radius, y + radius),
-            (x + radius, y + radius)
-        ]
+            if not (0 <= cx < cols and 0 <= cy < rows) or occupancy[cy * cols + cx]:
+                return False
         
-        return not any(self.is_wall(px, py) for px, py in points)
+        return True
 
-    def has_line_of_sight(self, pos1, pos2, precision=2):
+    def sample_line_of_sight(self, pos1, pos2, precision=2):
         """
-        تحقق إذا كان هناك خط رؤية مباشر بين نقطتين
-        مع تحسينات للدقة والأداء
+        خط الرؤية القديم بأخذ عينات كل precision بكسل
+        (محفوظ للمقارنة مع التتبع الدقيق)
         """
         steps = max(10, int(math.dist(pos1, pos2) // precision))
         
@@ -171,35 +461,29 @@ class World:
                 
         return True
 
-    def get_valid_position(self, min_dist=200, exclude_pos=None, max_attempts=100):
+    def get_free_cells(self, radius):
+        """فهرس الخلايا الحرة التي يتسع مركزها لكائن بنصف قطر معين"""
+        return self.get_derived(('free_cells', radius), lambda: FreeCellIndex(self, radius))
+
+    def get_valid_position(self, min_dist=200, exclude_pos=None, max_attempts=100,
+                           avoid=(), spacing=0):
         """
         الحصول على موقع عشوائي صالح في الخريطة
-        مع ضوابط للمسافة الآمنة
+        مع ضوابط للمسافة الآمنة عن exclude_pos وعن نقاط avoid
+        يعيد None فقط إذا لم يوجد أي موقع يحقق الشروط
         """
         radius = PLAYER_SETTINGS['size'] + 5  # هامش أمان
-        attempts = 0
-        
-        while attempts < max_attempts:
-            x = random.randint(1, len(self.grid[0])-2)
-            y = random.randint(1, len(self.grid)-2)
-            
-            if self.grid[y][x] == 0:  # تأكد أنها أرضية
-                pos = (
-                    x * self.cell_size + self.cell_size // 2,
-                    y * self.cell_size + self.cell_size // 2
-                )
-                
-                # التحقق من المسافة الآمنة
-                if exclude_pos and math.dist(pos, exclude_pos) < min_dist:
-                    attempts += 1
-                    continue
-                    
-                if self.is_valid_position(pos[0], pos[1], radius):
-                    return pos
-                    
-            attempts += 1
-            
-        return None  # إذا لم يتم العثور على موقع صالح
+        return self.get_free_cells(radius).random_position(
+            min_dist=min_dist if exclude_pos else 0,
+            exclude_pos=exclude_pos,
+            avoid=avoid,
+            spacing=spacing,
+            max_attempts=max_attempts
+        )
+
+    def get_free_positions_within(self, pos, radius):
+        """مراكز الخلايا الحرة ضمن نصف قطر معين من نقطة"""
+        return self.get_free_cells(PLAYER_SETTINGS['size'] + 5).positions_within(pos, radius)
 
     def get_neighbors(self, cell):
         """
@@ -207,23 +491,25 @@ class World:
         مع تحسينات للحركة القطرية
         """
         x, y = cell
+        cols, rows = self.cols, self.rows
+        occupancy = self.occupancy
         neighbors = []
         
         # الجوار الأساسي (أعلى، أسفل، يمين، يسار)
         for dx, dy in [(0,1), (1,0), (0,-1), (-1,0)]:
             nx, ny = x + dx, y + dy
-            if 0 <= nx < len(self.grid[0]) and 0 <= ny < len(self.grid):
-                if self.grid[ny][nx] != 1:  # تأكد أنها ليست جدارًا
+            if 0 <= nx < cols and 0 <= ny < rows:
+                if not occupancy[ny * cols + nx]:  # تأكد أنها ليست جدارًا
                     neighbors.append((nx, ny))
         
         # الجوار القطري (إذا كانت الحركة القطرية مسموحة)
         if AI_SETTINGS['pathfinding'].get('allow_diagonal', True):
             for dx, dy in [(1,1), (-1,-1), (1,-1), (-1,1)]:
                 nx, ny = x + dx, y + dy
-                if (0 <= nx < len(self.grid[0]) and 0 <= ny < len(self.grid) and
-                    self.grid[ny][nx] != 1 and
-                    self.grid[y][nx] != 1 and  # تأكد من عدم وجود جدار في المنتصف
-                    self.grid[ny][x] != 1):
+                if (0 <= nx < cols and 0 <= ny < rows and
+                    not occupancy[ny * cols + nx] and
+                    not occupancy[y * cols + nx] and  # تأكد من عدم وجود جدار في المنتصف
+                    not occupancy[ny * cols + x]):
                     neighbors.append((nx, ny))
         
         return neighbors
@@ -4,7 +4,11 @@ import math
 import random
 from settings import *
 from game.entities import Player, Guard, Objective
+from game.squad import GuardEngine
 from game.world import World
+from game.ai import AStar
+from game.workers import PathWorkerPool
+from game.sprites import SpriteAtlas, draw_guards
 from game.utils import distance
 
 from settings import (
@@ -29,8 +33,14 @@ class Game:
         self.all_sprites = pygame.sprite.Group()
         self.guards_group = pygame.sprite.Group()
         
-        # Initialize world
-        self.world = World()
+        # Initialize world (from a level file if one is configured)
+        if WORLD_SETTINGS['level']:
+            self.world = World.load(WORLD_SETTINGS['level'])
+        else:
+            self.world = World()
+        
+        # Draw every sprite frame once so entities only swap image references
+        SpriteAtlas.prebuild()
         
         # Set positions
         self.start_pos = self.world.get_start_position()
@@ -41,7 +51,13 @@ class Game:
         self.objective = Objective(*end_pos)
         self.all_sprites.add(self.player)
         
-        # Create initial guards
+        # Create initial guards (dropping path requests left from a previous round)
+        AStar.scheduler.clear()
+        self.guard_engine = GuardEngine()
+        workers = AI_SETTINGS['scheduler']['workers']
+        if workers and AStar.scheduler.pool is None:
+            # Searches run in background processes; the pool survives restarts
+            AStar.scheduler.pool = PathWorkerPool(workers)
         self.guards = []
         self.create_initial_guards()
         
@@ -58,19 +74,18 @@ class Game:
         guard_positions = []
         
         for _ in range(2):  # Initial guards
-            while True:
-                pos = self.world.get_valid_position(
-                    min_dist=GUARD_SETTINGS['behavior']['min_spawn_distance'],
-                    exclude_pos=(self.player.x, self.player.y)
-                )
-                if pos:
-                    if all(distance(pos, (g.x, g.y)) > 150 for g in self.guards):
-                        guard_positions.append(pos)
-                        break
+            pos = self.world.get_valid_position(
+                min_dist=GUARD_SETTINGS['behavior']['min_spawn_distance'],
+                exclude_pos=(self.player.x, self.player.y),
+                avoid=guard_positions,
+                spacing=150
+            )
+            if pos:
+                guard_positions.append(pos)
         
         for x, y in guard_positions:
             patrol_points = self.generate_patrol_points(x, y)
-            guard = Guard(x, y, patrol_points)
+            guard = Guard(x, y, patrol_points, self.guard_engine)
             
             if self.world.is_valid_position(guard.x, guard.y, guard.radius):
                 self.guards.append(guard)
@@ -78,7 +93,7 @@ class Game:
                 self.all_sprites.add(guard)
 
     def generate_patrol_points(self, x, y):
-        patrol_points = []
+        candidates = []
         directions = [(1,0), (0,1), (-1,0), (0,-1)]
         
         for dx, dy in directions:
@@ -86,10 +101,15 @@ class Game:
                 px = x + dx * self.world.cell_size * dist
                 py = y + dy * self.world.cell_size * dist
                 
-                if (0 <= px < SCREEN_WIDTH and 
-                    0 <= py < SCREEN_HEIGHT and 
-                    self.world.is_valid_position(px, py, PLAYER_SETTINGS['size'])):
-                    patrol_points.append((px, py))
+                if 0 <= px < SCREEN_WIDTH and 0 <= py < SCREEN_HEIGHT:
+                    candidates.append((px, py))
+        
+        # Check all candidates against the walls in one batched query
+        valid = self.world.are_valid_positions(
+            [p[0] for p in candidates], [p[1] for p in candidates],
+            PLAYER_SETTINGS['size']
+        )
+        patrol_points = [p for p, ok in zip(candidates, valid) if ok]
         
         if not patrol_points:
             for angle in range(0, 360, 90):
@@ -103,36 +123,32 @@ class Game:
 
     def spawn_additional_guards(self):
         for _ in range(4):
-            pos = None
-            attempts = 0
-            
-            while attempts < 50:
-                pos = self.world.get_valid_position(
-                    min_dist=GUARD_SETTINGS['min_spawn_distance'],
-                    exclude_pos=(self.player.x, self.player.y)
-                )
-                
-                if pos and all(distance(pos, (g.x, g.y)) > 150 for g in self.guards):
-                    break
-                    
-                attempts += 1
+            pos = self.world.get_valid_position(
+                min_dist=GUARD_SETTINGS['min_spawn_distance'],
+                exclude_pos=(self.player.x, self.player.y),
+                avoid=self.guard_engine.hash,
+                spacing=150
+            )
             
             if not pos:
                 continue
                 
-            patrol_points = []
+            candidates = []
             for _ in range(4):
                 angle = random.uniform(0, 2*math.pi)
                 dist = random.uniform(50, 120)
-                point = (
+                candidates.append((
                     pos[0] + math.cos(angle) * dist,
                     pos[1] + math.sin(angle) * dist
-                )
-                if self.world.is_valid_position(point[0], point[1], PLAYER_SETTINGS['size']):
-                    patrol_points.append(point)
+                ))
+            valid = self.world.are_valid_positions(
+                [p[0] for p in candidates], [p[1] for p in candidates],
+                PLAYER_SETTINGS['size']
+            )
+            patrol_points = [p for p, ok in zip(candidates, valid) if ok]
             
             if patrol_points:
-                guard = Guard(*pos, patrol_points)
+                guard = Guard(*pos, patrol_points, self.guard_engine)
                 self.guards.append(guard)
                 self.guards_group.add(guard)
                 self.all_sprites.add(guard)
@@ -159,13 +175,20 @@ class Game:
                 if event.key == CONTROLS['sneak']: self.keys['sneak'] = False
 
     def update(self):
-        # تحديث الحراس أولاً
-        for guard in self.guards:
-            result = guard.update(self.player, self.world)
+        # تحديث الحراس أولاً (كلهم في خطوة متجهة واحدة، أو واحداً واحداً)
+        if GUARD_SETTINGS['batch_update']:
+            results = [self.guard_engine.step(self.player.agent, self.world)]
+        else:
+            results = (guard.update(self.player, self.world) for guard in self.guards)
+        for result in results:
             if result == "caught":
                 self.game_state = "lose"
                 return
         
+        # Spend this frame's pathfinding budget on queued guard requests
+        if AI_SETTINGS['scheduler']['enabled']:
+            AStar.scheduler.run(AI_SETTINGS['scheduler']['frame_budget_ms'])
+        
         if self.game_state != "playing":
             return
             
@@ -203,8 +226,11 @@ class Game:
         if not self.objective.collected:
             self.objective.draw(self.screen)
         
-        for guard in self.guards:
-            guard.draw(self.screen)
+        if GUARD_SETTINGS['batch_update']:
+            draw_guards(self.screen, self.guard_engine)
+        else:
+            for guard in self.guards:
+                guard.draw(self.screen)
         
         self.player.draw(self.screen)
         self.draw_ui()
@@ -257,11 +283,15 @@ class Game:
         self.screen.blit(subtext, subtext_rect)
 
     def run(self):
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(FPS)
+        try:
+            while self.running:
+                self.handle_events()
+                self.update()
+                self.draw()
+                self.clock.tick(FPS)
+        finally:
+            # Stop pathfinding workers even if the loop exits with an error
+            AStar.scheduler.shutdown()
         
         pygame.quit()
         sys.exit()
@@ -1,5 +1,8 @@
-import pygame
-from pygame.locals import *
+try:
+    import pygame
+    from pygame.locals import *
+except ImportError:  # المحاكاة بدون واجهة (game.agents و game.squad) لا تحتاج pygame
+    pygame = None
 
 # ===== إعدادات النظام الأساسي =====
 SCREEN_WIDTH = 1024
@@ -37,18 +40,19 @@ ORANGE = COLORS['orange']
 YELLOW = COLORS['yellow']
 
 # ===== عناصر التحكم =====
-CONTROLS = {
-    'up': [K_UP, K_w],
-    'down': [K_DOWN, K_s],
-    'left': [K_LEFT, K_a],
-    'right': [K_RIGHT, K_d],
-    'sneak': [K_LCTRL, K_RCTRL],
-    'sprint': [K_LSHIFT, K_RSHIFT],
-    'interact': [K_e],
-    'inventory': [K_i],
-    'pause': [K_ESCAPE],
-    'restart': [K_r]
-}
+if pygame is not None:
+    CONTROLS = {
+        'up': [K_UP, K_w],
+        'down': [K_DOWN, K_s],
+        'left': [K_LEFT, K_a],
+        'right': [K_RIGHT, K_d],
+        'sneak': [K_LCTRL, K_RCTRL],
+        'sprint': [K_LSHIFT, K_RSHIFT],
+        'interact': [K_e],
+        'inventory': [K_i],
+        'pause': [K_ESCAPE],
+        'restart': [K_r]
+    }
 
 # ===== إعدادات اللاعب =====
 PLAYER_SETTINGS = {
@@ -106,7 +110,8 @@ GUARD_SETTINGS = {
         'search_radius': 150,
         'forget_time': 20
     },
-    'min_spawn_distance': 220  # أضف هذا السطر كمفتاح رئيسي أيضاً
+    'min_spawn_distance': 220,  # أضف هذا السطر كمفتاح رئيسي أيضاً
+    'batch_update': True  # تحديث كل الحراس بخطوة متجهة واحدة في GuardEngine بدل حلقة الكائنات
 }
 
 # ===== إعدادات الهدف =====
@@ -123,12 +128,27 @@ AI_SETTINGS = {
     'pathfinding': {
         'update_interval': 0.4,
         'max_length': 25,
-        'smoothing': True,
+        'smoothing': True,  # True = شد المسار داخل ممر الخلايا، 'line_of_sight' = التجانس القديم بخط الرؤية، False = مراكز الخلايا
         'direct_path': True,
         'node_distance': 40,
         'wall_avoidance': 1.5,
         'path_precision': 2,
-        'allow_diagonal': True
+        'allow_diagonal': True,
+        'backend': 'astar',  # 'astar' = بحث على الشبكة، 'jps' = بحث نقاط القفز، 'hpa' = بحث هرمي للخرائط الكبيرة، 'table' = جدول الخطوة التالية
+        'hpa_cluster_size': 10,  # طول ضلع مجموعة البحث الهرمي بالخلايا
+        'next_hop_max_cells': 2000,  # أقصى عدد خلايا مفتوحة لخبز جدول الخطوة التالية (الحجم = العدد² بايت)
+        'next_hop_file': None,  # ملف لحفظ الجدول وقراءته عبر memory mapping (None = في الذاكرة فقط)
+        'cache_size': 256,  # عدد المسارات المحفوظة في ذاكرة LRU (0 = تعطيل)
+        'chase_mode': 'astar',  # 'astar' = بحث لكل حارس، 'flow_field' = حقل تدفق مشترك، 'incremental' = شجرة بحث محفوظة لكل حارس
+        'flow_field_max_cost': 400,  # أقصى تكلفة يصلها حقل التدفق من اللاعب
+        'flow_field_steps': 4  # عدد الخطوات التي يأخذها الحارس من الحقل في كل تحديث
+    },
+    'scheduler': {
+        'enabled': True,  # توزيع بحث A* على الإطارات بدل البحث الفوري
+        'frame_budget_ms': 2.0,  # أقصى وقت للبحث في كل إطار
+        'slice_expansions': 32,  # عدد الخلايا الموسعة بين كل فحص للوقت
+        'workers': 0,  # عدد عمليات البحث الخلفية (0 = البحث داخل حلقة اللعبة)
+        'priorities': {'chase': 0, 'investigate': 1, 'search': 1, 'patrol': 2}  # الأصغر يُخدم أولاً
     },
     'behavior': {
         'reaction_time': 0.3,
@@ -146,6 +166,7 @@ AI_SETTINGS = {
 
 # ===== إعدادات العالم =====
 WORLD_SETTINGS = {
+    'level': None,  # مسار ملف مستوى ثنائي (None = الخريطة المدمجة)
     'cell_size': 64,
     'wall_thickness': 10,
     'lighting': {
@@ -158,6 +179,16 @@ WORLD_SETTINGS = {
         'enabled': True,
         'resolution': 1,
         'softness': 2
+    },
+    'clearance': {
+        'enabled': True,  # فحص التصادم بحقل المسافة بدل زوايا المربع
+        'resolution': None,  # دقة الحقل بالبكسل (تقسم cell_size؛ None = حسب حجم الخريطة)
+        'chunk_size': 16  # خلايا ضلع القطعة التي تُحسب عند أول استعلام فيها
+    },
+    'line_of_sight': 'exact',  # 'exact' = تتبع الخلايا، 'sampled' = العينات القديمة
+    'pvs': {
+        'enabled': False,  # جدول رؤية محسوب مسبقاً بين الخلايا
+        'max_distance': 450  # أقصى مسافة محسوبة (أكبر من مدى رؤية الحارس)
     }
 }
 
@@ -174,6 +205,10 @@ SOUND_SETTINGS = {
         'gunshot': 1000,
         'alert': 500,
         'whisper': 100
+    },
+    'propagation': {
+        'enabled': True,  # السمع بمسافة انتشار الصوت عبر الممرات بدل الخط المستقيم
+        'wall_attenuation': 4.0  # العبور داخل جدار يكلف هذا المضاعف من طول الخطوة
     }
 }
 
@@ -0,0 +1,60 @@
+import heapq
+import math
+import pytest
+from settings import *
+from game.ai import AStar
+
+
+@pytest.fixture
+def pathfinding(monkeypatch):
+    """تعديل إعدادات البحث لاختبار واحد (تُستعاد بعده) مع ذاكرة مسارات فارغة"""
+    AStar.path_cache.clear()
+
+    def configure(**values):
+        for name, value in values.items():
+            monkeypatch.setitem(AI_SETTINGS['pathfinding'], name, value)
+
+    yield configure
+    AStar.path_cache.clear()
+
+
+@pytest.fixture
+def shortest_costs():
+    """
+    Dijkstra مرجعي بسيط على أضلاع NavGraph للمقارنة مع خوارزميات البحث
+    Returns:
+        دالة (graph, source) -> قاموس أقل تكلفة من source لكل خلية يمكن الوصول إليها
+    """
+    def dijkstra(graph, source):
+        best = {source: 0.0}
+        frontier = [(0.0, source)]
+        while frontier:
+            cost, cell = heapq.heappop(frontier)
+            if cost > best[cell]:
+                continue
+            for i in range(graph.offsets[cell], graph.offsets[cell + 1]):
+                neighbor = graph.targets[i]
+                step = cost + graph.costs[i]
+                if step < best.get(neighbor, math.inf):
+                    best[neighbor] = step
+                    heapq.heappush(frontier, (step, neighbor))
+        return best
+
+    return dijkstra
+
+
+@pytest.fixture
+def path_cost():
+    """دالة (graph, cells) -> مجموع تكاليف أضلاع مسار خلايا متجاورة"""
+    def cost(graph, cells):
+        total = 0.0
+        for a, b in zip(cells, cells[1:]):
+            for i in range(graph.offsets[a], graph.offsets[a + 1]):
+                if graph.targets[i] == b:
+                    total += graph.costs[i]
+                    break
+            else:
+                raise AssertionError(f"الخليتان {a} و {b} غير متجاورتين")
+        return total
+
+    return cost
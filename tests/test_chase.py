@@ -0,0 +1,55 @@
+import math
+import random
+import pytest
+from game.ai import ChasePlanner, FlowField
+from game.generator import generate_level
+from game.navigation import NavGraph
+from game.world import World
+
+
+@pytest.fixture
+def maze():
+    return World(generate_level(40, 30, seed=4, rooms=4, loops=0.3))
+
+
+def test_flow_field_costs_match_dijkstra(maze, pathfinding, shortest_costs, path_cost):
+    pathfinding(flow_field_max_cost=math.inf)
+    graph = NavGraph.for_world(maze)
+    field = FlowField.for_world(maze)
+    floor = [cell for cell in range(len(graph.enterable)) if graph.enterable[cell]]
+    rng = random.Random(1)
+
+    for target in rng.sample(floor, 3):
+        field.update(maze.get_cell_center(graph.cell(target)))
+        for source in rng.sample(floor, 25):
+            expected = shortest_costs(graph, source).get(target, math.inf)
+            assert field.cost[source] == pytest.approx(expected)
+            # اتباع next_hop يعطي مساراً بنفس التكلفة
+            cells = [source]
+            while cells[-1] != target:
+                assert len(cells) <= len(floor)
+                cells.append(field.next_hop[cells[-1]])
+            assert path_cost(graph, cells) == pytest.approx(expected)
+
+
+def test_chase_planner_stays_optimal_while_both_move(maze, pathfinding, shortest_costs, path_cost):
+    pathfinding(max_length=maze.cols * maze.rows)
+    graph = NavGraph.for_world(maze)
+    planner = ChasePlanner(maze)
+    floor = [cell for cell in range(len(graph.enterable)) if graph.enterable[cell]]
+    rng = random.Random(2)
+
+    guard, target = rng.sample(floor, 2)
+    for _ in range(40):
+        cells = planner.plan(guard, target)
+        assert cells[0] == guard and cells[-1] == target
+        assert path_cost(graph, cells) == pytest.approx(shortest_costs(graph, guard)[target])
+
+        # الحارس يتقدم على مساره، والهدف يخطو خطوة عشوائية أو يقفز أحياناً
+        guard = cells[min(len(cells) - 1, rng.randint(1, 3))]
+        if rng.random() < 0.1:
+            target = rng.choice(floor)
+        else:
+            target = rng.choice([target] + list(graph.neighbors(target)))
+
+    assert planner.reroots > 0
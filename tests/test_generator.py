@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from game.generator import generate_level
+
+
+def reachable(grid, start):
+    """الخلايا غير الجدارية التي يمكن الوصول إليها من start بخطوات أفقية أو رأسية"""
+    rows, cols = grid.shape
+    seen = np.zeros(grid.shape, dtype=bool)
+    seen[start] = True
+    stack = [start]
+    while stack:
+        y, x = stack.pop()
+        for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+            if 0 <= ny < rows and 0 <= nx < cols and not seen[ny, nx] and grid[ny, nx] != 1:
+                seen[ny, nx] = True
+                stack.append((ny, nx))
+    return seen
+
+
+@pytest.mark.parametrize('options', [
+    dict(cols=41, rows=31),
+    dict(cols=60, rows=25, loops=0.3),
+    dict(cols=50, rows=50, rooms=6, loops=0.1),
+    dict(cols=47, rows=33, corridor_density=0.4, rooms=3),
+    dict(cols=5, rows=5),
+])
+def test_every_floor_cell_is_reachable(options):
+    for seed in range(3):
+        grid = generate_level(seed=seed, **options)
+        assert grid.shape == (options['rows'], options['cols'])
+        # الإطار الخارجي جدار كامل
+        assert (grid[0] == 1).all() and (grid[-1] == 1).all()
+        assert (grid[:, 0] == 1).all() and (grid[:, -1] == 1).all()
+
+        starts = np.argwhere(grid == 2)
+        ends = np.argwhere(grid == 3)
+        assert len(starts) == 1 and len(ends) == 1
+        seen = reachable(grid, tuple(starts[0]))
+        assert seen[tuple(ends[0])]
+        assert (seen == (grid != 1)).all()
+
+
+def test_same_seed_gives_same_level():
+    a = generate_level(80, 60, seed=4, rooms=5, loops=0.2)
+    b = generate_level(80, 60, seed=4, rooms=5, loops=0.2)
+    assert np.array_equal(a, b)
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# يعمل في عملية منفصلة لأن pygame قد يكون محملاً مسبقاً في عملية الاختبارات
+SIMULATION = textwrap.dedent('''
+    import sys
+    sys.modules['pygame'] = None  # أي import pygame يفشل
+    import numpy as np
+    from game.agents import EngineGuardAgent, GuardAgent, PlayerAgent
+    from game.generator import generate_level
+    from game.squad import GuardEngine
+    from game.world import World
+
+    world = World(generate_level(40, 40, seed=2, loops=0.2))
+    cs = world.cell_size
+    free = (np.argwhere(world.walls.T == 0) * cs + cs / 2).tolist()
+    player = PlayerAgent(*free[0])
+    engine = GuardEngine()
+    guards = [EngineGuardAgent(*free[i], None, engine) for i in range(5, 200, 20)]
+    solo = [GuardAgent(*free[i]) for i in range(7, 200, 40)]
+    start = (player.x, player.y)
+    for frame in range(60):
+        player.move({'right': frame < 30, 'down': frame >= 30, 'sprint': False}, world)
+        engine.step(player, world)
+        for guard in solo:
+            guard.update(player, world)
+    assert (player.x, player.y) != start
+    assert all(guard.state in ('patrol', 'investigate', 'search', 'chase') for guard in guards + solo)
+    assert not any(name.startswith('pygame') and module is not None for name, module in sys.modules.items())
+    print('ok')
+''')
+
+
+def test_simulation_runs_without_pygame():
+    result = subprocess.run([sys.executable, '-c', SIMULATION], cwd=ROOT,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith('ok')
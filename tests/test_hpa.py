@@ -0,0 +1,77 @@
+import random
+import numpy as np
+import pytest
+from game.ai import SearchArrays
+from game.generator import generate_level
+from game.hpa import HierarchicalPathfinder
+from game.navigation import NavGraph
+from game.world import World
+
+# المسار المجرد يمر بمداخل المجموعات، فقد يزيد قليلاً عن الأقصر في المساحات المفتوحة؛
+# الانحراف بضع خطوات، فنسبته كبيرة فقط في المسارات القصيرة
+MAX_MEAN_RATIO = 1.01
+MAX_LONG_RATIO = 1.06
+
+
+def open_level(cols, rows, seed):
+    """خريطة مفتوحة بإطار خارجي وأعمدة 2×2 متفرقة"""
+    rng = np.random.default_rng(seed)
+    grid = np.zeros((rows, cols), dtype=np.uint8)
+    grid[0, :] = grid[-1, :] = grid[:, 0] = grid[:, -1] = 1
+    xs = rng.integers(1, cols - 2, cols * rows // 100)
+    ys = rng.integers(1, rows - 2, cols * rows // 100)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            grid[ys + dy, xs + dx] = 1
+    return grid
+
+
+def sample_paths(world, count, seed):
+    graph = NavGraph.for_world(world)
+    hpa = HierarchicalPathfinder.for_world(world)
+    arrays = SearchArrays.for_world(world)
+    floor = [cell for cell in range(len(graph.enterable)) if graph.enterable[cell]]
+    rng = random.Random(seed)
+    for _ in range(count):
+        start, goal = rng.sample(floor, 2)
+        yield graph, start, goal, hpa.find_path(start, goal, arrays)
+
+
+def test_hpa_is_near_optimal_on_open_maps(pathfinding, shortest_costs, path_cost):
+    pathfinding(hpa_cluster_size=10)
+    world = World(open_level(60, 50, seed=3))
+    ratios = []
+    for graph, start, goal, cells in sample_paths(world, 60, seed=3):
+        assert cells[0] == start and cells[-1] == goal
+        optimal = shortest_costs(graph, start)[goal]
+        ratio = path_cost(graph, cells) / optimal
+        assert ratio >= 1.0 - 1e-9
+        if optimal >= 4 * 10:  # أربع مجموعات على الأقل
+            assert ratio <= MAX_LONG_RATIO
+        ratios.append(ratio)
+    assert np.mean(ratios) <= MAX_MEAN_RATIO
+
+
+def test_hpa_is_exact_in_a_perfect_maze(pathfinding, shortest_costs, path_cost):
+    # بدون حلقات يوجد طريق واحد بين أي خليتين، فأي مسار صحيح هو الأقصر
+    pathfinding(hpa_cluster_size=8)
+    world = World(generate_level(61, 45, seed=2))
+    for graph, start, goal, cells in sample_paths(world, 40, seed=2):
+        assert cells[0] == start and cells[-1] == goal
+        assert path_cost(graph, cells) == pytest.approx(shortest_costs(graph, start)[goal])
+
+
+def test_sliced_hpa_returns_the_same_path(pathfinding):
+    pathfinding(hpa_cluster_size=10)
+    world = World(open_level(60, 50, seed=4))
+    hpa = HierarchicalPathfinder.for_world(world)
+    for graph, start, goal, cells in sample_paths(world, 10, seed=4):
+        steps = hpa.path_steps(start, goal, SearchArrays(len(graph.enterable)), slice_size=4)
+        pauses = 0
+        try:
+            while True:
+                next(steps)
+                pauses += 1
+        except StopIteration as finished:
+            assert finished.value == cells
+        assert pauses > 0 or hpa.cluster_of(start) == hpa.cluster_of(goal)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from game.generator import generate_level
+from game.levels import TileMap, load_level, save_level
+from game.world import World
+
+
+@pytest.mark.parametrize('cols, rows, chunk_size', [(64, 64, 32), (45, 37, 16)])
+def test_saved_level_loads_back_unchanged(tmp_path, cols, rows, chunk_size):
+    path = str(tmp_path / 'level.bin')
+    grid = generate_level(cols, rows, seed=5, rooms=3, loops=0.2)
+    save_level(path, grid, chunk_size=chunk_size)
+
+    tiles = load_level(path)
+    assert isinstance(tiles, TileMap)
+    assert (tiles.width, tiles.height) == (cols, rows)
+    assert np.array_equal(np.asarray(tiles), grid)
+    assert np.array_equal(tiles.region(3, 2, 40, 30), grid[2:30, 3:40])
+    assert [tiles[y][x] for y, x in ((0, 0), (rows - 1, cols - 1), (rows // 2, 7))] == [
+        grid[0, 0], grid[rows - 1, cols - 1], grid[rows // 2, 7]]
+    assert tiles.markers == {2: tuple(np.argwhere(grid == 2)[0][::-1].tolist()),
+                             3: tuple(np.argwhere(grid == 3)[0][::-1].tolist())}
+
+
+def test_world_from_file_matches_world_from_array(tmp_path):
+    path = str(tmp_path / 'level.bin')
+    grid = generate_level(50, 40, seed=9, loops=0.1)
+    save_level(path, grid)
+
+    loaded = World.load(path)
+    reference = World(grid)
+    assert loaded.occupancy == reference.occupancy
+    assert loaded.find_tiles(2) == reference.find_tiles(2)
+    assert loaded.find_tiles(3) == reference.find_tiles(3)
+
+
+def test_edits_stay_in_memory(tmp_path):
+    path = str(tmp_path / 'level.bin')
+    grid = generate_level(20, 20, seed=1)
+    save_level(path, grid)
+
+    tiles = load_level(path)
+    tiles[1][2] = 1 - grid[1, 2]
+    assert tiles.get(2, 1) == 1 - grid[1, 2]
+    assert load_level(path).get(2, 1) == grid[1, 2]
+
+
+def test_rejects_files_that_are_not_levels(tmp_path):
+    path = tmp_path / 'level.bin'
+    path.write_bytes(b'not a level file at all, just text padding')
+    with pytest.raises(ValueError):
+        load_level(str(path))
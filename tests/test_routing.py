@@ -0,0 +1,43 @@
+import random
+import numpy as np
+import pytest
+from game.generator import generate_level
+from game.navigation import NavGraph
+from game.routing import NextHopTable
+from game.world import World
+
+
+def test_saved_table_is_rebaked_when_wall_penalties_change(tmp_path, pathfinding):
+    path = str(tmp_path / 'level.nh')
+    world = World(generate_level(16, 12, seed=3))
+    graph = NavGraph.for_world(world)
+    baked = NextHopTable.bake(graph)
+    baked.save(path)
+
+    loaded = NextHopTable.load(path, graph)
+    assert loaded is not None
+    assert np.array_equal(loaded.hops, baked.hops)
+
+    # نفس الإعدادات والخلايا المفتوحة لكن تكلفة دخول مختلفة (عدد جدران مجاورة آخر)
+    cell = int(baked.cells[len(baked.cells) // 2])
+    graph.enter_costs[cell] += 1.0
+    assert NextHopTable.load(path, graph) is None
+    graph.enter_costs[cell] -= 1.0
+
+    pathfinding(wall_avoidance=4.0)
+    assert NextHopTable.load(path, NavGraph.for_world(world)) is None
+
+
+def test_table_paths_are_optimal(shortest_costs, path_cost):
+    world = World(generate_level(24, 18, seed=6, rooms=3, loops=0.4))
+    graph = NavGraph.for_world(world)
+    table = NextHopTable.bake(graph)
+    floor = [int(cell) for cell in table.cells]
+    rng = random.Random(6)
+
+    for start in rng.sample(floor, 8):
+        best = shortest_costs(graph, start)
+        for goal in floor:
+            cells = table.find_path(start, goal)
+            assert cells[0] == start and cells[-1] == goal
+            assert path_cost(graph, cells) == pytest.approx(best[goal])
@@ -0,0 +1,57 @@
+import gc
+from array import array
+import random
+import numpy as np
+import pytest
+from game.ai import AStar, PathScheduler, SearchArrays, TYPED_ARRAYS_MIN_CELLS
+from game.generator import generate_level
+from game.world import World
+
+BUDGET_MS = 2.0
+# شريحة واحدة + تجانس المسار الأخير قد يتجاوزان الميزانية؛ بحث كامل بدون
+# تقسيم على هذه الخريطة يأخذ عشرات الميلي ثواني
+TOLERANCE_MS = 10.0
+
+
+@pytest.mark.parametrize('backend', ['astar', 'jps', 'hpa'])
+def test_searches_are_sliced_within_frame_budget(backend, pathfinding):
+    pathfinding(backend=backend, max_length=200 * 200, direct_path=False)
+    grid = generate_level(200, 200, seed=1, loops=0.1)
+    world = World(grid)
+    cs = world.cell_size
+    floor = np.argwhere(grid.T == 0) * cs + cs / 2
+    rng = random.Random(2)
+
+    scheduler = PathScheduler()
+    requests = []
+    for owner in range(8):
+        start = tuple(floor[rng.randrange(len(floor))].tolist())
+        end = tuple(floor[rng.randrange(len(floor))].tolist())
+        requests.append(scheduler.request(owner, start, end, world, owner % 3))
+
+    gc.disable()  # توقف جامع القمامة ليس من البحث
+    try:
+        while not all(request.done for request in requests):
+            scheduler.run(BUDGET_MS)
+    finally:
+        gc.enable()
+
+    assert all(request.path for request in requests)
+    assert scheduler.slices > 3 * len(requests)  # كل بحث توقف عدة مرات
+    assert scheduler.max_frame_ms < BUDGET_MS + TOLERANCE_MS
+    assert len(scheduler.spare_arrays) <= 1
+
+
+def test_typed_search_arrays_find_the_same_path(pathfinding):
+    pathfinding(max_length=80 * 80, direct_path=False, smoothing=False)
+    world = World(generate_level(80, 80, seed=3, loops=0.2))
+    start, end = (1, 1), (77, 77)
+    count = world.cols * world.rows
+
+    lists = SearchArrays(count)
+    typed = SearchArrays(TYPED_ARRAYS_MIN_CELLS)
+    typed.count = count  # نفس الخريطة؛ المصفوفات أطول من اللازم فقط
+    paths = [AStar.resume(AStar.search_steps(start, end, world, arrays)) for arrays in (lists, typed)]
+
+    assert isinstance(typed.g_score, array) and isinstance(lists.g_score, list)
+    assert paths[0] and paths[0] == paths[1]
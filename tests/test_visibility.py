@@ -0,0 +1,39 @@
+import random
+import pytest
+from game.generator import generate_level
+from game.visibility import VisibilitySet
+from game.world import World
+
+MAX_DISTANCE = 450
+
+
+@pytest.mark.parametrize('seed', [7, 11])
+def test_pvs_never_rejects_a_visible_pair(seed):
+    world = World(generate_level(40, 30, seed=seed, rooms=8, loops=0.5))
+    pvs = VisibilitySet(world, MAX_DISTANCE)
+    cs = world.cell_size
+    floor = [cell for cell, solid in enumerate(world.occupancy) if not solid]
+    rng = random.Random(seed)
+
+    checked = 0
+    for _ in range(4000):
+        cell = rng.choice(floor)
+        x1, y1 = cell % world.cols, cell // world.cols
+        x2, y2 = x1 + rng.randint(-7, 7), y1 + rng.randint(-7, 7)
+        if not (0 <= x2 < world.cols and 0 <= y2 < world.rows) or world.occupancy[y2 * world.cols + x2]:
+            continue
+        # نقاط عشوائية داخل الخلايا وليس مراكزها فقط
+        a = ((x1 + rng.random()) * cs, (y1 + rng.random()) * cs)
+        b = ((x2 + rng.random()) * cs, (y2 + rng.random()) * cs)
+        if world.trace_line_of_sight(a, b):
+            assert pvs.might_see(world.cell_id(a), world.cell_id(b)), (a, b)
+            checked += 1
+    assert checked > 100
+
+
+def test_pvs_keeps_grazing_diagonal_pair():
+    world = World(generate_level(40, 30, seed=7, rooms=8, loops=0.5))
+    pvs = VisibilitySet(world, MAX_DISTANCE)
+    a, b = (1802.93, 236.86), (1528.41, 544.24)
+    assert world.trace_line_of_sight(a, b)
+    assert pvs.might_see(world.cell_id(a), world.cell_id(b))